@@ -0,0 +1,19 @@
+"""Shared BigQuery client for the pipeline modules.
+
+``bq_client`` returns one process-wide :class:`bigquery.Client`, so loads,
+merges and the prospecting build share its auth and connection pool.
+"""
+
+from __future__ import annotations
+
+import functools
+
+from google.cloud import bigquery
+
+from pipeline.config import GCP_PROJECT_ID
+
+
+@functools.lru_cache(maxsize=1)
+def bq_client() -> bigquery.Client:
+    """Process-wide BigQuery client (shares auth and connection pool)."""
+    return bigquery.Client(project=GCP_PROJECT_ID)
@@ -14,33 +14,45 @@ the Nonprofit Open Data Collective GitHub repository.
 from __future__ import annotations
 
 import csv
+import hashlib
 import logging
-from dataclasses import dataclass, field
+import pickle
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass
 from pathlib import Path
-
-import requests
+from types import MappingProxyType
 
 from pipeline.config import CONCORDANCE_CSV_URL, CONCORDANCE_DIR
+from pipeline.http_client import conditional_get
 
 logger = logging.getLogger(__name__)
 
 CONCORDANCE_LOCAL = CONCORDANCE_DIR / "concordance.csv"
 
+# Resolved xpath maps, pickled and keyed by a hash of the concordance CSV and
+# the variable maps below, so each process doesn't re-parse the CSV.
+_MAPS_CACHE = CONCORDANCE_DIR / "xpath_maps.pkl"
+
 
 # ── Download ──────────────────────────────────────────────────────────────
 
 
 def download_concordance(force: bool = False) -> Path:
-    """Download the master concordance CSV if not already cached."""
+    """Download the master concordance CSV if not already cached.
+
+    With *force*, the cached copy is revalidated with a conditional GET and
+    only re-downloaded if it changed upstream.
+    """
     if CONCORDANCE_LOCAL.exists() and not force:
         logger.debug("Concordance already cached at %s", CONCORDANCE_LOCAL)
         return CONCORDANCE_LOCAL
 
     logger.info("Downloading master concordance from GitHub …")
-    resp = requests.get(CONCORDANCE_CSV_URL, timeout=120)
-    resp.raise_for_status()
-    CONCORDANCE_LOCAL.write_bytes(resp.content)
-    logger.info("Concordance saved (%d KB)", len(resp.content) // 1024)
+    if conditional_get(CONCORDANCE_CSV_URL, CONCORDANCE_LOCAL, timeout=120):
+        logger.info("Concordance saved (%d KB)", CONCORDANCE_LOCAL.stat().st_size // 1024)
+    else:
+        logger.info("Concordance unchanged since last download.")
     return CONCORDANCE_LOCAL
 
 
@@ -53,29 +65,47 @@ class VariableInfo:
 
     variable_name: str
     description: str = ""
-    xpaths: list[str] = field(default_factory=list)
+    xpaths: tuple[str, ...] = ()
 
 
 def load_concordance() -> dict[str, VariableInfo]:
     """Parse the concordance CSV into a dict keyed by variable_name.
 
-    Each value is a ``VariableInfo`` with all known xpaths for that variable.
+    Each value is a ``VariableInfo`` with all known xpaths for that variable,
+    as a tuple of interned strings.
     """
     path = download_concordance()
     variables: dict[str, VariableInfo] = {}
+    xpaths: dict[str, list[str]] = {}
 
     with open(path, newline="", encoding="utf-8", errors="replace") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+        header = next(reader, [])
+        try:
+            i_var = header.index("variable_name")
+            i_xpath = header.index("xpath")
+        except ValueError:
+            logger.error("Concordance %s lacks variable_name / xpath columns", path)
+            return variables
+        i_desc = header.index("description") if "description" in header else None
+
         for row in reader:
-            vname = (row.get("variable_name") or "").strip()
-            xpath = (row.get("xpath") or "").strip()
-            desc = (row.get("description") or "").strip()
+            try:
+                vname = row[i_var].strip()
+                xpath = row[i_xpath].strip()
+            except IndexError:
+                continue
             if not vname or not xpath:
                 continue
+            desc = row[i_desc].strip() if i_desc is not None and i_desc < len(row) else ""
 
             if vname not in variables:
                 variables[vname] = VariableInfo(variable_name=vname, description=desc)
-            variables[vname].xpaths.append(xpath)
+                xpaths[vname] = []
+            xpaths[vname].append(sys.intern(xpath))
+
+    for vname, info in variables.items():
+        info.xpaths = tuple(xpaths[vname])
 
     logger.info("Loaded %d unique variables from concordance.", len(variables))
     return variables
@@ -84,7 +114,7 @@ def load_concordance() -> dict[str, VariableInfo]:
 # ── Pre-built xpath sets for each target field ────────────────────────────
 # We define a mapping from *our* output column names to concordance
 # variable names.  The ``build_xpath_map`` function then resolves these
-# into lists of xpaths that the XML parser can iterate.
+# into tuples of xpaths that the XML parser can iterate.
 
 
 # Header / identity fields (Part 00)
@@ -140,37 +170,93 @@ SUMMARY_VAR_MAP: dict[str, str] = {
 def build_xpath_map(
     concordance: dict[str, VariableInfo],
     var_map: dict[str, str],
-) -> dict[str, list[str]]:
-    """For each output column, resolve the concordance variable to a list of xpaths.
+) -> Mapping[str, tuple[str, ...]]:
+    """For each output column, resolve the concordance variable to its xpaths.
 
-    Returns a dict: output_column_name → [xpath1, xpath2, ...].
-    Missing variables are logged as warnings and mapped to an empty list.
+    Returns a read-only mapping: output_column_name → (xpath1, xpath2, ...).
+    Missing variables are logged as warnings and mapped to an empty tuple.
     """
-    result: dict[str, list[str]] = {}
+    result: dict[str, tuple[str, ...]] = {}
     for col, var_name in var_map.items():
         info = concordance.get(var_name)
         if info:
             result[col] = info.xpaths
         else:
             logger.warning("Concordance variable %s not found (col=%s)", var_name, col)
-            result[col] = []
-    return result
+            result[col] = ()
+    return MappingProxyType(result)
 
 
 # ── Convenience: pre-built maps for the parser ────────────────────────────
 
 
-def get_all_xpath_maps() -> dict[str, dict[str, list[str]]]:
+_VAR_MAPS: dict[str, dict[str, str]] = {
+    "header": HEADER_VAR_MAP,
+    "signature": SIGNATURE_VAR_MAP,
+    "summary": SUMMARY_VAR_MAP,
+}
+
+
+def _maps_digest(path: Path) -> str:
+    """Hash the concordance CSV together with the variable maps it resolves."""
+    h = hashlib.blake2b(path.read_bytes(), digest_size=16)
+    h.update(repr(sorted((k, sorted(v.items())) for k, v in _VAR_MAPS.items())).encode())
+    return h.hexdigest()
+
+
+def _load_cached_maps(digest: str) -> dict[str, Mapping[str, tuple[str, ...]]] | None:
+    """Return the pickled xpath maps if they were built from *digest*."""
+    try:
+        cached = pickle.loads(_MAPS_CACHE.read_bytes())
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("Ignoring unreadable xpath map cache %s", _MAPS_CACHE)
+        return None
+    if not isinstance(cached, dict) or cached.get("hash") != digest:
+        return None
+    return {
+        section: MappingProxyType({
+            col: tuple(sys.intern(xp) for xp in xpaths)
+            for col, xpaths in xpath_map.items()
+        })
+        for section, xpath_map in cached["maps"].items()
+    }
+
+
+def _save_cached_maps(digest: str, maps: dict[str, Mapping[str, tuple[str, ...]]]) -> None:
+    payload = {
+        "hash": digest,
+        "maps": {section: dict(xpath_map) for section, xpath_map in maps.items()},
+    }
+    tmp = _MAPS_CACHE.with_suffix(".pkl.part")
+    try:
+        tmp.write_bytes(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+        tmp.replace(_MAPS_CACHE)
+    except OSError:
+        logger.warning("Could not write xpath map cache %s", _MAPS_CACHE, exc_info=True)
+
+
+def get_all_xpath_maps() -> dict[str, Mapping[str, tuple[str, ...]]]:
     """Return all xpath maps needed by the 990 XML parser.
 
-    Returns a dict with keys ``header``, ``signature``, ``summary``.
+    Returns a dict with keys ``header``, ``signature``, ``summary``.  The
+    maps are cached in ``xpath_maps.pkl`` and rebuilt from the concordance
+    CSV only when it (or the variable maps) change.
     """
+    digest = _maps_digest(download_concordance())
+    maps = _load_cached_maps(digest)
+    if maps is not None:
+        logger.debug("Loaded xpath maps from %s", _MAPS_CACHE)
+        return maps
+
     concordance = load_concordance()
-    return {
-        "header": build_xpath_map(concordance, HEADER_VAR_MAP),
-        "signature": build_xpath_map(concordance, SIGNATURE_VAR_MAP),
-        "summary": build_xpath_map(concordance, SUMMARY_VAR_MAP),
+    maps = {
+        section: build_xpath_map(concordance, var_map)
+        for section, var_map in _VAR_MAPS.items()
     }
+    _save_cached_maps(digest, maps)
+    return maps
 
 
 if __name__ == "__main__":
@@ -136,6 +136,45 @@ BQ_TABLE_ORGANIZATIONS = "organizations"
 BQ_TABLE_FILINGS = "filings"
 BQ_TABLE_SCHEDULE_M = "schedule_m"
 BQ_VIEW_PROSPECTING = "vw_inkind_prospecting"
+BQ_TABLE_PROSPECTING = "tbl_inkind_prospecting"
+BQ_TABLE_NTEE_MAJOR_GROUP = "dim_ntee_major_group"
+
+# Integer-range partitioning of filings / schedule_m on tax_year:
+# (start, end (exclusive), interval).
+BQ_TAX_YEAR_PARTITION_RANGE = (2010, 2040, 1)
+
+# ---------------------------------------------------------------------------
+# NTEE major groups: first letter of the NTEE code → label
+# (loaded into BQ_TABLE_NTEE_MAJOR_GROUP by setup_bigquery.py)
+# ---------------------------------------------------------------------------
+NTEE_MAJOR_GROUPS = {
+    "A": "Arts, Culture & Humanities",
+    "B": "Education",
+    "C": "Environment and Animals",
+    "D": "Animal-Related",
+    "E": "Health",
+    "F": "Mental Health & Crisis",
+    "G": "Diseases, Disorders & Medical",
+    "H": "Medical Research",
+    "I": "Crime & Legal-Related",
+    "J": "Employment & Job-Related",
+    "K": "Food, Agriculture & Nutrition",
+    "L": "Housing & Shelter",
+    "M": "Public Safety & Disaster",
+    "N": "Recreation & Sports",
+    "O": "Youth Development",
+    "P": "Human Services",
+    "Q": "International",
+    "R": "Civil Rights & Advocacy",
+    "S": "Community Improvement",
+    "T": "Philanthropy & Voluntarism",
+    "U": "Science & Technology",
+    "V": "Social Science",
+    "W": "Public & Societal Benefit",
+    "X": "Religion Related",
+    "Y": "Mutual & Membership Benefit",
+    "Z": "Unknown / Unclassified",
+}
 
 # ---------------------------------------------------------------------------
 # Schedule M property type definitions (lines 1-28)
@@ -171,3 +210,14 @@ SCHEDULE_M_PROPERTY_TYPES = [
     (27, "other_3", "Other (3)"),
     (28, "other_4", "Other (4)"),
 ]
+
+# Schedule M property types surfaced as ``accepts_*`` convenience columns in
+# the prospecting view: field_prefix → column name.
+SCHEDULE_M_ACCEPTS_ALIASES = {
+    "food_inventory": "accepts_food",
+    "clothing_household": "accepts_clothing",
+    "cars_vehicles": "accepts_vehicles",
+    "books_publications": "accepts_books",
+    "drugs_medical": "accepts_drugs_medical",
+    "securities_publicly_traded": "accepts_securities",
+}
@@ -1,20 +1,25 @@
 #!/usr/bin/env python3
 """Download IRS EO BMF CSV files and filter for 501(c)(3) organizations.
 
-Produces a single JSONL file at ``data/parsed/organizations.jsonl`` containing
-all 501(c)(3) records from all 52 state/territory files.
+Produces a single Parquet file at ``data/parsed/organizations.parquet``
+containing all 501(c)(3) records from all 52 state/territory files (and,
+optionally, the same records as ``organizations.jsonl``).
 """
 
 from __future__ import annotations
 
-import csv
-import io
-import json
+import contextlib
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import requests
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
 from tqdm import tqdm
 
 from pipeline.config import (
@@ -23,6 +28,7 @@ from pipeline.config import (
     BMF_URLS,
     PARSED_DIR,
 )
+from pipeline.http_client import conditional_get
 
 logger = logging.getLogger(__name__)
 
@@ -34,107 +40,209 @@ _INT_COLUMNS = {
     "ACCT_PD",
 }
 
+# SUBSECTION values that identify a 501(c)(3).  The BMF CSV stores this as
+# "03" (zero-padded), but tolerate the unpadded form too.
+_SUBSECTION_501C3 = pa.array(["3", "03"])
+
+# Read every column we keep as a string; integer columns are cast after
+# trimming so that blanks / non-numeric values become nulls (not errors).
+_READ_OPTIONS = pv.ReadOptions(block_size=8 << 20)
+_CONVERT_OPTIONS = pv.ConvertOptions(
+    column_types={col: pa.string() for col in BMF_COLUMN_MAP},
+    include_columns=list(BMF_COLUMN_MAP),
+    include_missing_columns=True,
+    strings_can_be_null=False,
+)
+_NULL_STRING = pa.scalar(None, pa.string())
+
+# Integer text Arrow can cast to int64: a leading "+" is stripped first, and
+# at most 18 significant digits always fit, so one bad cell becomes null
+# instead of failing the cast for the whole file.
+_PLUS_SIGN_RE = r"^\+"
+_INT64_RE = r"^-?0*\d{1,18}$"
+
+# Schema of the parsed records (and of organizations.parquet).
+ORGANIZATIONS_SCHEMA = pa.schema([
+    (name, pa.int64() if csv_col in _INT_COLUMNS else pa.string())
+    for csv_col, name in BMF_COLUMN_MAP.items()
+])
+
+# Streaming writer: rows per record batch, and how many batches may be
+# queued between the download/parse workers and the JSONL writer.
+_BATCH_ROWS = 32_768
+_QUEUE_SIZE = 8
+
+
+def download_bmf_csv(
+    state_code: str,
+    url: str,
+    dest_dir: Path,
+    refresh: bool = False,
+) -> Path:
+    """Download a single BMF CSV file. Returns the local file path.
 
-def _safe_int(value: str) -> int | None:
-    """Convert a string to int, returning None for blanks / non-numeric."""
-    if not value or not value.strip():
-        return None
-    try:
-        return int(value.strip())
-    except (ValueError, TypeError):
-        return None
-
-
-def download_bmf_csv(state_code: str, url: str, dest_dir: Path) -> Path:
-    """Download a single BMF CSV file. Returns the local file path."""
-    dest = dest_dir / f"eo_{state_code}.csv"
-    if dest.exists() and dest.stat().st_size > 0:
+    An existing copy is reused as-is unless *refresh* is set, in which case
+    it is revalidated with a conditional GET and only re-downloaded if the
+    IRS has published a newer file.
+    """
+    dest = dest_dir / f"eo_{state_code}.csv.zst"
+    if dest.exists() and dest.stat().st_size > 0 and not refresh:
         logger.debug("Already downloaded %s", dest.name)
         return dest
 
-    resp = requests.get(url, timeout=120)
-    resp.raise_for_status()
-    dest.write_bytes(resp.content)
-    logger.debug("Downloaded %s (%d bytes)", dest.name, len(resp.content))
+    if conditional_get(url, dest, timeout=120):
+        logger.debug("Downloaded %s (%d bytes)", dest.name, dest.stat().st_size)
+    else:
+        logger.debug("%s unchanged since last download", dest.name)
     return dest
 
 
-def parse_bmf_csv(path: Path) -> list[dict]:
-    """Read a BMF CSV and return 501(c)(3) records as dicts."""
-    records: list[dict] = []
-    raw = path.read_bytes()
-    text = raw.decode("utf-8", errors="replace")
-    reader = csv.DictReader(io.StringIO(text))
-
-    for row in reader:
-        # Filter: SUBSECTION == 03 → 501(c)(3)
-        # The BMF CSV stores this as "03" (zero-padded)
-        sub = row.get("SUBSECTION", "").strip()
-        if sub not in ("3", "03"):
-            continue
-
-        record: dict = {}
-        for csv_col, bq_col in BMF_COLUMN_MAP.items():
-            value = row.get(csv_col, "")
-            if value is not None:
-                value = value.strip()
-            if csv_col in _INT_COLUMNS:
-                record[bq_col] = _safe_int(value)
-            else:
-                record[bq_col] = value if value else None
-        records.append(record)
-
-    return records
+def _read_bmf_table(path: Path) -> pa.Table:
+    """Read the BMF columns we keep from a CSV as an Arrow table of strings."""
+    try:
+        return pv.read_csv(path, read_options=_READ_OPTIONS, convert_options=_CONVERT_OPTIONS)
+    except pa.ArrowInvalid:
+        # Arrow rejects invalid UTF-8; fall back to a lenient decode.
+        logger.debug("Re-reading %s with replacement decoding", path.name)
+        with pa.input_stream(str(path)) as f:
+            text = f.read().decode("utf-8", errors="replace")
+        return pv.read_csv(
+            pa.BufferReader(text.encode("utf-8")),
+            read_options=_READ_OPTIONS,
+            convert_options=_CONVERT_OPTIONS,
+        )
+
+
+def parse_bmf_csv(path: Path) -> pa.Table:
+    """Read a BMF CSV and return its 501(c)(3) records as an Arrow table.
+
+    Columns are renamed per ``BMF_COLUMN_MAP``.  String values are trimmed
+    (blanks become null) and ``_INT_COLUMNS`` are cast to int64, with
+    non-numeric values becoming null.  EINs are left-padded to 9 digits so
+    consumers can match them without re-normalising.
+    """
+    table = _read_bmf_table(path)
+
+    # Filter: SUBSECTION == 03 → 501(c)(3)
+    subsection = pc.utf8_trim_whitespace(table["SUBSECTION"])
+    table = table.filter(pc.is_in(subsection, value_set=_SUBSECTION_501C3))
+
+    columns: list[pa.ChunkedArray] = []
+    for csv_col in BMF_COLUMN_MAP:
+        values = pc.utf8_trim_whitespace(table[csv_col])
+        if csv_col == "EIN":
+            values = pc.if_else(pc.equal(values, ""), values, pc.utf8_lpad(values, 9, "0"))
+        if csv_col in _INT_COLUMNS:
+            values = pc.replace_substring_regex(values, _PLUS_SIGN_RE, "")
+            numeric = pc.match_substring_regex(values, _INT64_RE)
+            columns.append(pc.cast(pc.if_else(numeric, values, _NULL_STRING), pa.int64()))
+        else:
+            columns.append(pc.if_else(pc.equal(values, ""), _NULL_STRING, values))
+
+    return pa.Table.from_arrays(columns, schema=ORGANIZATIONS_SCHEMA)
+
+
+def _download_and_parse(
+    code: str,
+    url: str,
+    out: queue.Queue,
+    stop: threading.Event,
+    refresh: bool,
+) -> None:
+    """Worker: download and parse one state file, pushing batches onto *out*.
+
+    Always finishes by putting a ``None`` sentinel so the writer can count
+    completed states, even when the download or parse fails.  Stops early
+    once *stop* is set (the writer has bailed out).
+    """
+    try:
+        if stop.is_set():
+            return
+        path = download_bmf_csv(code, url, BMF_DIR, refresh=refresh)
+        table = parse_bmf_csv(path)
+        for batch in table.to_batches(max_chunksize=_BATCH_ROWS):
+            if stop.is_set():
+                return
+            out.put(batch)
+    except Exception:
+        logger.exception("Failed to download or parse %s", code)
+    finally:
+        out.put(None)
 
 
 def download_and_parse_all(
     max_workers: int = 10,
     force_download: bool = False,
+    write_jsonl: bool = False,
 ) -> Path:
-    """Download all BMF CSVs in parallel, parse, and write JSONL.
+    """Download and parse all BMF CSVs in parallel, streaming records to Parquet.
 
-    Returns the path to the output JSONL file.
-    """
-    output_path = PARSED_DIR / "organizations.jsonl"
+    Worker threads download + parse each state and push Arrow record batches
+    onto a bounded queue; the calling thread drains it and writes the output,
+    so only a few batches are held in memory at a time.
+
+    With *force_download*, cached state CSVs are revalidated against the IRS
+    (unchanged files cost a ``304 Not Modified``) and the output is rebuilt.
+    With *write_jsonl*, ``organizations.jsonl`` is written alongside the
+    Parquet file for consumers that still expect it.
 
-    if output_path.exists() and not force_download:
-        logger.info("organizations.jsonl already exists. Use force_download=True to re-create.")
+    Returns the path to the output Parquet file.
+    """
+    output_path = PARSED_DIR / "organizations.parquet"
+    jsonl_path = PARSED_DIR / "organizations.jsonl"
+
+    if (
+        output_path.exists()
+        and (jsonl_path.exists() or not write_jsonl)
+        and not force_download
+    ):
+        logger.info("organizations.parquet already exists. Use force_download=True to re-create.")
         return output_path
 
-    # Step 1: Download CSV files in parallel
-    logger.info("Downloading %d BMF CSV files ...", len(BMF_URLS))
-    csv_paths: dict[str, Path] = {}
-
-    with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        futures = {
-            pool.submit(download_bmf_csv, code, url, BMF_DIR): code
-            for code, url in BMF_URLS.items()
-        }
-        for future in tqdm(as_completed(futures), total=len(futures), desc="Downloading BMF"):
-            code = futures[future]
-            try:
-                csv_paths[code] = future.result()
-            except Exception:
-                logger.exception("Failed to download %s", code)
-
-    # Step 2: Parse and filter each CSV
-    logger.info("Parsing %d CSV files for 501(c)(3) records ...", len(csv_paths))
-    all_records: list[dict] = []
-
-    for code in tqdm(sorted(csv_paths), desc="Parsing BMF"):
+    logger.info("Downloading + parsing %d BMF CSV files ...", len(BMF_URLS))
+    batches: queue.Queue = queue.Queue(maxsize=_QUEUE_SIZE)
+    stop = threading.Event()
+    tmp_path = output_path.with_suffix(".parquet.part")
+    tmp_jsonl = jsonl_path.with_suffix(".jsonl.part")
+    remaining = len(BMF_URLS)
+    total = 0
+
+    with (
+        ThreadPoolExecutor(max_workers=max_workers) as pool,
+        tqdm(total=len(BMF_URLS), desc="BMF states") as pbar,
+    ):
+        for code, url in BMF_URLS.items():
+            pool.submit(_download_and_parse, code, url, batches, stop, force_download)
+
         try:
-            records = parse_bmf_csv(csv_paths[code])
-            all_records.extend(records)
-        except Exception:
-            logger.exception("Failed to parse %s", code)
-
-    # Step 3: Write JSONL
-    logger.info("Writing %d records to %s", len(all_records), output_path)
-    with open(output_path, "w", encoding="utf-8") as f:
-        for rec in all_records:
-            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
-
-    logger.info("BMF download complete: %d 501(c)(3) organizations", len(all_records))
+            with (
+                pq.ParquetWriter(tmp_path, ORGANIZATIONS_SCHEMA, compression="zstd") as writer,
+                (
+                    open(tmp_jsonl, "wb")
+                    if write_jsonl else contextlib.nullcontext()
+                ) as f,
+            ):
+                while remaining:
+                    batch = batches.get()
+                    if batch is None:
+                        remaining -= 1
+                        pbar.update(1)
+                        continue
+                    writer.write_batch(batch)
+                    if write_jsonl:
+                        f.writelines(orjson.dumps(rec) + b"\n" for rec in batch.to_pylist())
+                    total += batch.num_rows
+        finally:
+            # On error, unblock the workers so the pool can shut down.
+            stop.set()
+            while remaining:
+                if batches.get() is None:
+                    remaining -= 1
+
+    tmp_path.replace(output_path)
+    if write_jsonl:
+        tmp_jsonl.replace(jsonl_path)
+    logger.info("BMF download complete: %d 501(c)(3) organizations", total)
     return output_path
 
 
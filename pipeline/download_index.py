@@ -7,18 +7,20 @@ Index CSVs are now at:
 
 Produces a CSV at ``data/index/filtered_index.csv`` containing only Form 990
 (full) filers that are 501(c)(3) organizations.  The optional EIN filter is
-built from a previously-downloaded organizations JSONL file.
+built from a previously-parsed ``organizations.parquet`` file.
 """
 
 from __future__ import annotations
 
 import csv
-import json
+import io
 import logging
 from pathlib import Path
 
-import pandas as pd
-import requests
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
 from tqdm import tqdm
 
 from pipeline.config import (
@@ -27,67 +29,131 @@ from pipeline.config import (
     TAX_YEARS,
     irs_index_url,
 )
+from pipeline.http_client import conditional_get
 
 logger = logging.getLogger(__name__)
 
+# Columns kept in filtered_index.csv, keyed by their (normalised) name in the
+# IRS index CSV.  The new IRS format includes XML_BATCH_ID, which tells us
+# which ZIP bundle the XML is in; older indexes lack it.
+_INDEX_COLUMNS = {
+    "OBJECT_ID": "object_id",
+    "EIN": "ein",
+    "TAX_PERIOD": "tax_period",
+    "TAXPAYER_NAME": "taxpayer_name",
+    "RETURN_TYPE": "return_type",
+    "SUB_DATE": "sub_date",
+    "DLN": "dln",
+    "XML_BATCH_ID": "xml_batch_id",
+}
+_INDEX_SCHEMA = pa.schema([(name, pa.string()) for name in _INDEX_COLUMNS.values()])
+
 
 def download_index_csv(year: int, force: bool = False) -> Path:
-    """Download the IRS TEOS index CSV for the given filing year."""
-    dest = INDEX_DIR / f"index_{year}.csv"
+    """Download the IRS TEOS index CSV for the given filing year.
+
+    With *force*, an existing copy is revalidated with a conditional GET and
+    only re-downloaded if the IRS has published a newer index.
+    """
+    dest = INDEX_DIR / f"index_{year}.csv.zst"
     if dest.exists() and dest.stat().st_size > 0 and not force:
         logger.debug("Index for %d already downloaded.", year)
         return dest
 
     url = irs_index_url(year)
     logger.info("Downloading index for %d from %s", year, url)
-    resp = requests.get(url, timeout=300, stream=True)
-    resp.raise_for_status()
-
-    with open(dest, "wb") as f:
-        for chunk in resp.iter_content(chunk_size=1024 * 1024):
-            f.write(chunk)
-
-    logger.info("Downloaded %s (%d MB)", dest.name, dest.stat().st_size // (1024 * 1024))
+    if conditional_get(url, dest, timeout=300):
+        logger.info("Downloaded %s (%d MB)", dest.name, dest.stat().st_size // (1024 * 1024))
+    else:
+        logger.info("Index for %d unchanged since last download.", year)
     return dest
 
 
-def load_501c3_eins() -> set[str] | None:
-    """Load the set of 501(c)(3) EINs from the parsed organizations JSONL.
+def load_501c3_eins() -> frozenset[str] | None:
+    """Load the set of 501(c)(3) EINs from the parsed organizations Parquet.
 
-    Returns None if the file does not exist (skip EIN filter).
+    Only the ``ein`` column is read; EINs are stored already padded to 9
+    digits.  Returns None if the file does not exist (skip EIN filter).
     """
-    orgs_path = PARSED_DIR / "organizations.jsonl"
+    orgs_path = PARSED_DIR / "organizations.parquet"
     if not orgs_path.exists():
         logger.warning(
-            "organizations.jsonl not found; skipping 501(c)(3) EIN filter. "
+            "organizations.parquet not found; skipping 501(c)(3) EIN filter. "
             "Run download_bmf.py first for a tighter filter."
         )
         return None
 
-    if orgs_path.stat().st_size == 0:
-        logger.warning("organizations.jsonl is empty; skipping EIN filter.")
-        return None
-
-    eins: set[str] = set()
-    with open(orgs_path, "r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            row = json.loads(line)
-            ein = row.get("ein")
-            if ein:
-                # Pad to 9 digits for matching
-                eins.add(str(ein).zfill(9))
+    eins = frozenset(pq.read_table(orgs_path, columns=["ein"])["ein"].drop_null().to_pylist())
     logger.info("Loaded %d 501(c)(3) EINs for filtering.", len(eins))
     return eins if eins else None
 
 
+def _open_index_csv(path: Path) -> pv.CSVStreamingReader:
+    """Open an IRS index CSV as a stream of all-string record batches.
+
+    Header names are normalised (stripped, upper-cased) and only the
+    ``_INDEX_COLUMNS`` are read; any that are missing come back as nulls.
+    """
+    # Only the header line is read, decoded incrementally (so no multibyte
+    # character is split) and parsed with CSV quoting rules.
+    with (
+        pa.input_stream(str(path)) as f,
+        io.TextIOWrapper(f, encoding="utf-8-sig", newline="") as text,
+    ):
+        header = next(csv.reader(text), [])
+    names = [c.strip().upper() for c in header]
+
+    return pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(column_names=names, skip_rows=1, block_size=16 << 20),
+        convert_options=pv.ConvertOptions(
+            column_types={name: pa.string() for name in (*names, *_INDEX_COLUMNS)},
+            include_columns=list(_INDEX_COLUMNS),
+            include_missing_columns=True,
+            strings_can_be_null=False,
+        ),
+    )
+
+
+def _filter_index_batch(batch: pa.RecordBatch, ein_values: pa.Array | None) -> pa.RecordBatch:
+    """Keep Form 990 rows (optionally only listed EINs) and tidy the values."""
+    columns = {
+        name: pc.utf8_trim_whitespace(pc.fill_null(batch.column(name), ""))
+        for name in _INDEX_COLUMNS
+    }
+    columns["EIN"] = pc.utf8_lpad(columns["EIN"], width=9, padding="0")
+
+    # Filter for Form 990 (full) only — not 990EZ, 990PF, 990O, etc.
+    mask = pc.equal(columns["RETURN_TYPE"], "990")
+    # Filter by EIN if we have the 501(c)(3) list
+    if ein_values is not None:
+        mask = pc.and_(mask, pc.is_in(columns["EIN"], value_set=ein_values))
+
+    return pa.RecordBatch.from_arrays(list(columns.values()), schema=_INDEX_SCHEMA).filter(mask)
+
+
+def download_indexes(force: bool = False) -> list[Path]:
+    """Download the index CSVs for all configured TAX_YEARS.
+
+    Years that fail to download are logged and left out.
+    """
+    index_paths: list[Path] = []
+    for year in TAX_YEARS:
+        try:
+            index_paths.append(download_index_csv(year, force=force))
+        except Exception:
+            logger.exception("Failed to download index for %d", year)
+    return index_paths
+
+
 def build_filtered_index(
     force: bool = False,
+    index_paths: list[Path] | None = None,
 ) -> Path:
     """Download index files for configured TAX_YEARS and produce a filtered CSV.
 
-    Returns path to ``data/index/filtered_index.csv``.
+    Pass *index_paths* from an earlier ``download_indexes`` call to skip the
+    download step.  Returns path to ``data/index/filtered_index.csv``.
     """
     output_path = INDEX_DIR / "filtered_index.csv"
 
@@ -95,58 +161,26 @@ def build_filtered_index(
         logger.info("filtered_index.csv already exists. Use force=True to rebuild.")
         return output_path
 
-    # Download indexes
-    index_paths: list[Path] = []
-    for year in TAX_YEARS:
-        try:
-            index_paths.append(download_index_csv(year, force=force))
-        except Exception:
-            logger.exception("Failed to download index for %d", year)
+    if index_paths is None:
+        index_paths = download_indexes(force=force)
 
     # Load 501(c)(3) EINs (optional filter)
     ein_filter = load_501c3_eins()
-
-    # Read, filter, and combine
-    all_rows: list[dict] = []
-    for path in tqdm(index_paths, desc="Filtering indexes"):
-        df = pd.read_csv(path, dtype=str)
-        # Normalize column names
-        df.columns = [c.strip().upper() for c in df.columns]
-
-        # Filter for Form 990 (full) only — not 990EZ, 990PF, 990O, etc.
-        df = df[df["RETURN_TYPE"] == "990"]
-
-        # Filter by EIN if we have the 501(c)(3) list
-        if ein_filter is not None:
-            df["EIN_PADDED"] = df["EIN"].str.zfill(9)
-            df = df[df["EIN_PADDED"].isin(ein_filter)]
-            df = df.drop(columns=["EIN_PADDED"])
-
-        for _, row in df.iterrows():
-            # The new IRS format includes XML_BATCH_ID which tells us
-            # which ZIP bundle the XML is in.
-            all_rows.append({
-                "object_id": str(row.get("OBJECT_ID", "")).strip(),
-                "ein": str(row.get("EIN", "")).strip().zfill(9),
-                "tax_period": str(row.get("TAX_PERIOD", "")).strip(),
-                "taxpayer_name": str(row.get("TAXPAYER_NAME", "")).strip(),
-                "return_type": str(row.get("RETURN_TYPE", "")).strip(),
-                "sub_date": str(row.get("SUB_DATE", "")).strip(),
-                "dln": str(row.get("DLN", "")).strip(),
-                "xml_batch_id": str(row.get("XML_BATCH_ID", "")).strip(),
-            })
-
-    # Write filtered index
-    logger.info("Writing %d filtered index rows to %s", len(all_rows), output_path)
-    with open(output_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=[
-            "object_id", "ein", "tax_period", "taxpayer_name",
-            "return_type", "sub_date", "dln", "xml_batch_id",
-        ])
-        writer.writeheader()
-        writer.writerows(all_rows)
-
-    logger.info("Filtered index complete: %d Form 990 filings", len(all_rows))
+    ein_values = pa.array(sorted(ein_filter), pa.string()) if ein_filter is not None else None
+
+    # Stream, filter, and write each batch as it is read
+    tmp_path = output_path.with_suffix(".csv.part")
+    total = 0
+    with pv.CSVWriter(tmp_path, _INDEX_SCHEMA) as writer:
+        for path in tqdm(index_paths, desc="Filtering indexes"):
+            for batch in _open_index_csv(path):
+                filtered = _filter_index_batch(batch, ein_values)
+                if filtered.num_rows:
+                    writer.write_batch(filtered)
+                    total += filtered.num_rows
+    tmp_path.replace(output_path)
+
+    logger.info("Filtered index complete: %d Form 990 filings", total)
     return output_path
 
 
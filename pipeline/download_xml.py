@@ -8,18 +8,27 @@ contains thousands of individual XML files.  This module:
 2. Downloads each unique ZIP bundle (skipping already-downloaded ones).
 3. Extracts only the XML files for object IDs in our filtered index.
 
-A checkpoint file tracks which bundles have been fully processed.
+The extracted XMLs are their own checkpoint: a bundle is skipped once every
+object ID it is needed for already exists in ``XML_DIR``, or is recorded in
+the bundle's ``<batch>.done.json`` marker as absent from it (the index
+sometimes lists returns that the bundle does not contain).
 """
 
 from __future__ import annotations
 
 import csv
+import json
 import logging
+import os
+import shutil
+import struct
 import zipfile
+import zlib
 from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-import requests
 from tqdm import tqdm
 
 from pipeline.config import (
@@ -29,41 +38,58 @@ from pipeline.config import (
     ZIP_DIR,
     irs_zip_url,
 )
+from pipeline.http_client import get_session
 
 logger = logging.getLogger(__name__)
 
-CHECKPOINT_FILE = ZIP_DIR / ".processed_batches.txt"
+# Threads used to extract members from a single ZIP bundle.
+_EXTRACT_WORKERS = 8
 
 
-def _load_checkpoint() -> set[str]:
-    if not CHECKPOINT_FILE.exists():
+def _existing_object_ids() -> set[str]:
+    """Return the object IDs that already have a non-empty XML in XML_DIR."""
+    if not XML_DIR.exists():
         return set()
-    return set(CHECKPOINT_FILE.read_text().splitlines())
+    with os.scandir(XML_DIR) as it:
+        return {
+            entry.name[:-4]
+            for entry in it
+            if entry.name.endswith(".xml") and entry.stat().st_size > 0
+        }
 
 
-def _append_checkpoint(batch_id: str) -> None:
-    with open(CHECKPOINT_FILE, "a", encoding="utf-8") as f:
-        f.write(batch_id + "\n")
+def load_index() -> Iterator[tuple[str, str]]:
+    """Stream ``(object_id, xml_batch_id)`` pairs from the filtered index.
 
-
-def load_index() -> list[dict]:
-    """Read the filtered index and return a list of dicts."""
+    Only the two columns needed for downloading are kept, one row at a time,
+    so memory does not grow with the size of the index.
+    """
     path = INDEX_DIR / "filtered_index.csv"
     if not path.exists():
         raise FileNotFoundError(f"{path} not found. Run download_index.py first.")
-    rows: list[dict] = []
     with open(path, newline="", encoding="utf-8") as f:
-        for row in csv.DictReader(f):
-            rows.append(row)
-    return rows
-
-
-def _group_by_batch(index_rows: list[dict]) -> dict[tuple[int, str], set[str]]:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        try:
+            i_oid = header.index("object_id")
+            i_batch = header.index("xml_batch_id")
+        except ValueError:
+            logger.warning("%s is missing object_id / xml_batch_id columns", path)
+            return
+        width = max(i_oid, i_batch) + 1
+        for row in reader:
+            if len(row) >= width:
+                yield row[i_oid], row[i_batch]
+
+
+def _group_by_batch(
+    index_rows: Iterable[tuple[str, str]],
+) -> dict[tuple[int, str], set[str]]:
     """Group object IDs by (year, batch_id) for targeted extraction."""
     groups: dict[tuple[int, str], set[str]] = defaultdict(set)
-    for row in index_rows:
-        batch_id = row.get("xml_batch_id", "").strip()
-        oid = row.get("object_id", "").strip()
+    for oid, batch_id in index_rows:
+        batch_id = batch_id.strip()
+        oid = oid.strip()
         if not batch_id or not oid:
             continue
         # Extract year from batch_id (e.g., "2025_TEOS_XML_01A" → 2025)
@@ -76,6 +102,131 @@ def _group_by_batch(index_rows: list[dict]) -> dict[tuple[int, str], set[str]]:
     return groups
 
 
+# A member's location in its bundle:
+# (filename, header_offset, compress_size, compress_type, CRC-32).
+_Member = tuple[str, int, int, int, int]
+
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+_LOCAL_HEADER_SIG = b"PK\x03\x04"
+_COPY_CHUNK = 256 * 1024
+
+
+def _member_index_path(zip_path: Path) -> Path:
+    return zip_path.with_suffix(".members.json")
+
+
+def _done_path(zip_path: Path) -> Path:
+    return zip_path.with_suffix(".done.json")
+
+
+def _absent_object_ids(batch_id: str) -> set[str]:
+    """Return the object IDs a processed bundle was found not to contain."""
+    try:
+        with open(_done_path(ZIP_DIR / f"{batch_id}.zip"), encoding="utf-8") as f:
+            return set(json.load(f)["absent"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return set()
+
+
+def _write_done(zip_path: Path, absent: list[str]) -> None:
+    """Record a processed bundle and the wanted object IDs it lacks."""
+    done_path = _done_path(zip_path)
+    tmp = done_path.with_suffix(".json.part")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"absent": sorted(absent)}, f, separators=(",", ":"))
+    tmp.replace(done_path)
+
+
+def _xml_members(zip_path: Path) -> dict[str, _Member]:
+    """Map object_id → member location for the XML members of a bundle.
+
+    Member names look like ``202543569349100509_public.xml``.  The map is
+    saved next to the ZIP as ``<batch>.members.json`` the first time, so
+    later runs needing new object IDs from the same bundle skip re-reading
+    its central directory (tens of thousands of entries per bundle).
+    """
+    index_path = _member_index_path(zip_path)
+    try:
+        if index_path.stat().st_mtime_ns >= zip_path.stat().st_mtime_ns:
+            with open(index_path, encoding="utf-8") as f:
+                return {oid: tuple(m) for oid, m in json.load(f).items()}
+    except (OSError, ValueError):
+        pass
+
+    members: dict[str, _Member] = {}
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        for info in zf.infolist():
+            name = info.filename
+            if not name.lower().endswith(".xml"):
+                continue
+            stem = name.rpartition("/")[2][:-4]
+            members[stem.replace("_public", "")] = (
+                name, info.header_offset, info.compress_size, info.compress_type, info.CRC,
+            )
+
+    tmp = index_path.with_suffix(".json.part")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(members, f, separators=(",", ":"))
+    tmp.replace(index_path)
+    return members
+
+
+def _copy_member(zf, member: _Member, dst) -> None:
+    """Inflate one member straight from the archive's raw bytes into *dst*.
+
+    Seeks to the member's local header and streams its data through zlib,
+    verifying the CRC; no central-directory parse or ZipFile object needed.
+    """
+    name, offset, size, method, crc = member
+    zf.seek(offset)
+    sig, name_len, extra_len = _LOCAL_HEADER.unpack(zf.read(_LOCAL_HEADER.size))
+    if sig != _LOCAL_HEADER_SIG:
+        raise zipfile.BadZipFile(f"Bad local header for {name}")
+    zf.seek(offset + _LOCAL_HEADER.size + name_len + extra_len)
+
+    inflater = zlib.decompressobj(-zlib.MAX_WBITS) if method == zipfile.ZIP_DEFLATED else None
+    running_crc = 0
+    remaining = size
+    while remaining:
+        chunk = zf.read(min(_COPY_CHUNK, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated member {name}")
+        remaining -= len(chunk)
+        data = inflater.decompress(chunk) if inflater else chunk
+        running_crc = zlib.crc32(data, running_crc)
+        dst.write(data)
+    if inflater:
+        data = inflater.flush()
+        running_crc = zlib.crc32(data, running_crc)
+        dst.write(data)
+    if running_crc != crc:
+        raise zipfile.BadZipFile(f"Bad CRC-32 for {name}")
+
+
+def _extract_members(zip_path: Path, items: list[tuple[str, _Member]]) -> None:
+    """Extract ``(object_id, member)`` pairs of *zip_path* into XML_DIR."""
+    fallback: zipfile.ZipFile | None = None
+    try:
+        with open(zip_path, "rb") as zf:
+            for oid, member in items:
+                dest = XML_DIR / f"{oid}.xml"
+                # Write then rename: the file's existence marks it as done.
+                tmp = dest.with_suffix(".xml.part")
+                with open(tmp, "wb") as dst:
+                    if member[3] in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                        _copy_member(zf, member, dst)
+                    else:
+                        # Other compression methods go through zipfile.
+                        if fallback is None:
+                            fallback = zipfile.ZipFile(zip_path, "r")
+                        with fallback.open(member[0]) as src:
+                            shutil.copyfileobj(src, dst, length=_COPY_CHUNK)
+                tmp.replace(dest)
+    finally:
+        if fallback is not None:
+            fallback.close()
+
+
 def download_and_extract_batch(
     year: int,
     batch_id: str,
@@ -104,48 +255,62 @@ def download_and_extract_batch(
     if not zip_path.exists() or zip_path.stat().st_size == 0:
         url = irs_zip_url(batch_id, year)
         logger.info("Downloading %s ...", url)
-        resp = requests.get(url, timeout=600, stream=True)
-        resp.raise_for_status()
-        with open(zip_path, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=1024 * 1024):
-                f.write(chunk)
+        # Stream to a .part file and rename when complete, so an interrupted
+        # download is never mistaken for a finished ZIP on the next run.
+        part_path = zip_path.with_suffix(".zip.part")
+        with get_session().get(url, timeout=600, stream=True) as resp:
+            resp.raise_for_status()
+            resp.raw.decode_content = True
+            with open(part_path, "wb") as f:
+                shutil.copyfileobj(resp.raw, f, length=1024 * 1024)
+        part_path.replace(zip_path)
         logger.debug("Saved %s (%d MB)", zip_path.name, zip_path.stat().st_size // (1024 * 1024))
 
     # Extract XMLs
-    extracted = 0
     try:
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            for name in zf.namelist():
-                if not name.lower().endswith(".xml"):
-                    continue
-
-                # Determine object_id from filename (e.g., "202543569349100509_public.xml")
-                stem = Path(name).stem  # e.g., "202543569349100509_public"
-                oid = stem.replace("_public", "")
-
-                # If we have a target set, only extract matching files
-                if target_oids is not None and oid not in target_oids:
-                    continue
-
-                dest = XML_DIR / f"{oid}.xml"
-                if dest.exists():
-                    extracted += 1
-                    continue
-
-                data = zf.read(name)
-                dest.write_bytes(data)
-                extracted += 1
+        members = _xml_members(zip_path)
+        wanted = members.keys() if target_oids is None else target_oids
+
+        extracted = 0
+        pending: list[tuple[str, _Member]] = []
+        absent: list[str] = []
+        for oid in wanted:
+            info = members.get(oid)
+            if info is None:
+                absent.append(oid)
+                continue
+            extracted += 1
+            if not (XML_DIR / f"{oid}.xml").exists():
+                pending.append((oid, info))
+
+        # zlib releases the GIL, so members inflate in parallel; each worker
+        # reads through its own file handle.
+        n_workers = min(_EXTRACT_WORKERS, len(pending))
+        if n_workers:
+            with ThreadPoolExecutor(max_workers=n_workers) as pool:
+                list(pool.map(
+                    _extract_members,
+                    [zip_path] * n_workers,
+                    [pending[i::n_workers] for i in range(n_workers)],
+                ))
     except zipfile.BadZipFile:
         logger.error("Bad ZIP file: %s — deleting and will retry next run", zip_path)
         zip_path.unlink(missing_ok=True)
+        _member_index_path(zip_path).unlink(missing_ok=True)
+        _done_path(zip_path).unlink(missing_ok=True)
         return 0
 
+    if absent:
+        logger.debug("Batch %s: %d indexed object IDs not in the bundle", batch_id, len(absent))
+    _write_done(zip_path, absent)
+
     return extracted
 
 
 def download_xmls(
     force: bool = False,
     limit_batches: int | None = None,
+    max_workers: int = 8,
 ) -> int:
     """Download and extract all needed ZIP bundles.
 
@@ -155,24 +320,32 @@ def download_xmls(
         If True, re-process already-completed batches.
     limit_batches : int | None
         If set, only process this many batches (useful for testing).
+    max_workers : int
+        Number of ZIP bundles downloaded and extracted concurrently.
 
     Returns
     -------
     int
         Total number of XML files extracted.
     """
-    index_rows = load_index()
-    if not index_rows:
-        logger.warning("Filtered index is empty. Nothing to download.")
-        return 0
-
-    batch_groups = _group_by_batch(index_rows)
+    batch_groups = _group_by_batch(load_index())
     if not batch_groups:
-        logger.warning("No batch IDs found in index. Nothing to download.")
+        logger.warning("No batch IDs found in filtered index. Nothing to download.")
         return 0
 
-    done = set() if force else _load_checkpoint()
-    to_process = {k: v for k, v in batch_groups.items() if k[1] not in done}
+    if force:
+        to_process = batch_groups
+    else:
+        # A batch is done when each of its object IDs was extracted or is
+        # known to be absent from the bundle; markers are only read for
+        # batches with XMLs still missing.
+        existing = _existing_object_ids()
+        to_process = {}
+        for (year, batch_id), oids in batch_groups.items():
+            missing = oids - existing
+            if missing and not missing <= _absent_object_ids(batch_id):
+                to_process[(year, batch_id)] = oids
+    done = len(batch_groups) - len(to_process)
 
     if limit_batches is not None:
         keys = list(to_process.keys())[:limit_batches]
@@ -184,18 +357,23 @@ def download_xmls(
 
     logger.info(
         "Processing %d ZIP batches (%d already done, %d total) ...",
-        len(to_process), len(done), len(batch_groups),
+        len(to_process), done, len(batch_groups),
     )
 
     total_extracted = 0
-    for (year, batch_id), target_oids in tqdm(to_process.items(), desc="Downloading ZIPs"):
-        try:
-            n = download_and_extract_batch(year, batch_id, target_oids)
-            total_extracted += n
-            _append_checkpoint(batch_id)
-            logger.debug("Batch %s: extracted %d XMLs", batch_id, n)
-        except Exception:
-            logger.exception("Failed to process batch %s", batch_id)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(download_and_extract_batch, year, batch_id, target_oids): batch_id
+            for (year, batch_id), target_oids in to_process.items()
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Downloading ZIPs"):
+            batch_id = futures[future]
+            try:
+                n = future.result()
+                total_extracted += n
+                logger.debug("Batch %s: extracted %d XMLs", batch_id, n)
+            except Exception:
+                logger.exception("Failed to process batch %s", batch_id)
 
     logger.info("Downloaded and extracted %d XML files from %d batches.",
                 total_extracted, len(to_process))
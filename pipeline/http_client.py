@@ -0,0 +1,114 @@
+"""Shared HTTP helpers for the pipeline's file downloads.
+
+``conditional_get`` keeps the ``ETag`` / ``Last-Modified`` validators of each
+downloaded file in a sidecar JSON file (``<name>.meta.json``).  Re-fetching
+the same URL sends ``If-None-Match`` / ``If-Modified-Since`` so the server can
+answer ``304 Not Modified`` instead of resending an unchanged file.
+
+A *dest* ending in ``.zst`` is zstd-compressed as it is written, so large
+text downloads (BMF and index CSVs) take a fraction of the disk space and
+read I/O; PyArrow decompresses ``.zst`` files transparently when reading.
+
+``get_session`` returns a process-wide :class:`requests.Session` so repeated
+requests to the same host reuse keep-alive connections instead of paying a
+new TCP + TLS handshake each time.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+
+import pyarrow as pa
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1024 * 1024
+
+# Connection pool sizing: one pool per host (IRS, GitHub, local mirrors) and
+# enough connections per pool for the BMF download threads.
+_POOL_CONNECTIONS = 20
+_POOL_MAXSIZE = 50
+
+# Retry idempotent GETs on transient gateway errors and dropped connections.
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset({"GET", "HEAD"}),
+)
+
+_session: requests.Session | None = None
+
+
+def get_session() -> requests.Session:
+    """Return the shared keep-alive session, creating it on first use."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=_POOL_CONNECTIONS,
+            pool_maxsize=_POOL_MAXSIZE,
+            max_retries=_RETRY,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
+
+def _meta_path(dest: Path) -> Path:
+    return dest.with_name(dest.name + ".meta.json")
+
+
+def _load_validators(dest: Path) -> dict[str, str]:
+    """Return conditional request headers for an existing local copy."""
+    meta_path = _meta_path(dest)
+    if not dest.exists() or dest.stat().st_size == 0 or not meta_path.exists():
+        return {}
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+    headers: dict[str, str] = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def conditional_get(url: str, dest: Path, timeout: int = 120) -> bool:
+    """Download *url* to *dest*, revalidating any existing copy first.
+
+    Returns True if *dest* was (re)written, False if the server answered
+    ``304 Not Modified`` and the local copy was kept.  The body is streamed
+    to a ``.part`` file and renamed into place, so an interrupted download
+    never leaves a truncated *dest* behind.
+    """
+    headers = _load_validators(dest)
+
+    with get_session().get(url, headers=headers, timeout=timeout, stream=True) as resp:
+        if resp.status_code == 304:
+            logger.debug("%s not modified; keeping %s", url, dest.name)
+            return False
+        resp.raise_for_status()
+
+        tmp = dest.with_name(dest.name + ".part")
+        compression = "zstd" if dest.suffix == ".zst" else None
+        with pa.output_stream(str(tmp), compression=compression) as f:
+            for chunk in resp.iter_content(chunk_size=_CHUNK_SIZE):
+                f.write(chunk)
+        tmp.replace(dest)
+
+        meta = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+    _meta_path(dest).write_text(json.dumps(meta), encoding="utf-8")
+    return True
@@ -1,23 +1,39 @@
 #!/usr/bin/env python3
-"""Upload parsed JSONL files to GCS and load into BigQuery tables.
+"""Upload parsed files to GCS and load them into BigQuery tables.
 
 Handles the three main tables: organizations, filings, and schedule_m.
 Files are first uploaded to a GCS staging bucket, then loaded into BigQuery
 using a load job (WRITE_TRUNCATE mode for idempotent full refreshes).
+
+The parser's JSONL outputs are converted to Parquet, typed by the target
+table's schema, before upload: BigQuery ingests Parquet column blocks
+directly instead of decoding JSON text row by row, and the zstd-compressed
+file is several times smaller to upload.
 """
 
 from __future__ import annotations
 
+import functools
+import json
 import logging
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pj
+import pyarrow.parquet as pq
 from google.cloud import bigquery, storage
+from google.cloud.storage import transfer_manager
 
+from pipeline.bq import bq_client
 from pipeline.config import (
     BQ_DATASET,
     BQ_TABLE_FILINGS,
     BQ_TABLE_ORGANIZATIONS,
     BQ_TABLE_SCHEDULE_M,
+    BQ_TAX_YEAR_PARTITION_RANGE,
     GCP_PROJECT_ID,
     GCS_BUCKET,
     PARSED_DIR,
@@ -26,17 +42,42 @@ from pipeline.config import (
 logger = logging.getLogger(__name__)
 
 
+# ── Clients ───────────────────────────────────────────────────────────────
+
+
+@functools.lru_cache(maxsize=1)
+def _gcs() -> storage.Client:
+    """Process-wide Cloud Storage client."""
+    return storage.Client(project=GCP_PROJECT_ID)
+
+
 # ── GCS upload ────────────────────────────────────────────────────────────
 
 
+# Files larger than one chunk are sent as a multipart upload with the chunks
+# streamed over parallel connections; smaller ones use a single request.
+_UPLOAD_CHUNK_SIZE = 32 * 1024 * 1024
+_UPLOAD_WORKERS = 8
+
+
 def upload_to_gcs(local_path: Path, gcs_blob_name: str) -> str:
     """Upload a local file to GCS and return the gs:// URI."""
-    client = storage.Client(project=GCP_PROJECT_ID)
-    bucket = client.bucket(GCS_BUCKET)
+    bucket = _gcs().bucket(GCS_BUCKET)
     blob = bucket.blob(gcs_blob_name)
 
     logger.info("Uploading %s → gs://%s/%s ...", local_path.name, GCS_BUCKET, gcs_blob_name)
-    blob.upload_from_filename(str(local_path), timeout=600)
+    if local_path.stat().st_size > _UPLOAD_CHUNK_SIZE:
+        transfer_manager.upload_chunks_concurrently(
+            str(local_path),
+            blob,
+            chunk_size=_UPLOAD_CHUNK_SIZE,
+            max_workers=_UPLOAD_WORKERS,
+            # Threads, not processes: load_all already calls this from a pool.
+            worker_type=transfer_manager.THREAD,
+            timeout=600,
+        )
+    else:
+        blob.upload_from_filename(str(local_path), timeout=600)
     uri = f"gs://{GCS_BUCKET}/{gcs_blob_name}"
     logger.info("Upload complete: %s", uri)
     return uri
@@ -44,80 +85,293 @@ def upload_to_gcs(local_path: Path, gcs_blob_name: str) -> str:
 
 # ── BigQuery load ─────────────────────────────────────────────────────────
 
+# Must match the partitioning setup_bigquery.py gives filings / schedule_m;
+# a truncating load that omits it would otherwise be rejected or drop it.
+_TAX_YEAR_PARTITIONING = bigquery.RangePartitioning(
+    field="tax_year",
+    range_=bigquery.PartitionRange(
+        start=BQ_TAX_YEAR_PARTITION_RANGE[0],
+        end=BQ_TAX_YEAR_PARTITION_RANGE[1],
+        interval=BQ_TAX_YEAR_PARTITION_RANGE[2],
+    ),
+)
+
+
+def wait_for_load(load_job: bigquery.LoadJob) -> None:
+    """Block until *load_job* completes and log how many rows it loaded."""
+    load_job.result()  # Block until complete
+    dest = load_job.destination
+    logger.info(
+        "Loaded %d rows into %s.%s",
+        load_job.output_rows or 0, dest.dataset_id, dest.table_id,
+    )
+
+
+def _start_load(
+    client: bigquery.Client,
+    gcs_uri: str,
+    table_ref: str,
+    job_config: bigquery.LoadJobConfig,
+    wait: bool,
+) -> bigquery.LoadJob:
+    logger.info(
+        "Loading %s → %s (mode=%s) ...", gcs_uri, table_ref, job_config.write_disposition,
+    )
+    load_job = client.load_table_from_uri(gcs_uri, table_ref, job_config=job_config)
+    if wait:
+        wait_for_load(load_job)
+    return load_job
+
 
-def load_jsonl_to_bq(
+def load_parquet_to_bq(
     gcs_uri: str,
     table_name: str,
     write_disposition: str = "WRITE_TRUNCATE",
+    wait: bool = True,
+    range_partitioning: bigquery.RangePartitioning | None = None,
 ) -> bigquery.LoadJob:
-    """Load a JSONL file from GCS into a BigQuery table.
+    """Load a Parquet file from GCS into a BigQuery table.
 
-    Uses schema auto-detection disabled — the table must already exist
-    (created by ``setup_bigquery.py``).
+    The table must already exist (created by ``setup_bigquery.py``); its
+    schema is passed to the load job so a truncating load keeps the column
+    modes and descriptions instead of adopting the Parquet file's schema.
+    With ``wait=False`` the job is returned as soon as it is submitted.
     """
-    client = bigquery.Client(project=GCP_PROJECT_ID)
+    client = bq_client()
     table_ref = f"{GCP_PROJECT_ID}.{BQ_DATASET}.{table_name}"
 
     job_config = bigquery.LoadJobConfig(
-        source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+        source_format=bigquery.SourceFormat.PARQUET,
         write_disposition=write_disposition,
-        # Don't auto-detect — use the schema already on the table
-        autodetect=False,
-        # Tolerate a few bad rows (e.g., schema mismatches from edge cases)
-        max_bad_records=100,
-        ignore_unknown_values=True,
+        schema=client.get_table(table_ref).schema,
+        range_partitioning=range_partitioning,
     )
+    return _start_load(client, gcs_uri, table_ref, job_config, wait)
 
-    logger.info("Loading %s → %s (mode=%s) ...", gcs_uri, table_ref, write_disposition)
-    load_job = client.load_table_from_uri(gcs_uri, table_ref, job_config=job_config)
-    load_job.result()  # Block until complete
 
-    table = client.get_table(table_ref)
-    logger.info(
-        "Loaded %d rows into %s.%s",
-        table.num_rows, table.dataset_id, table.table_id,
+# ── JSONL → Parquet ───────────────────────────────────────────────────────
+
+_ARROW_TYPES: dict[str, pa.DataType] = {
+    "STRING": pa.string(),
+    "INTEGER": pa.int64(),
+    "INT64": pa.int64(),
+    "BOOLEAN": pa.bool_(),
+    "BOOL": pa.bool_(),
+    "FLOAT": pa.float64(),
+    "FLOAT64": pa.float64(),
+    "DATE": pa.date32(),
+}
+
+
+# ISO dates are the only strings cast to DATE; anything else (the parser
+# keeps unrecognised date formats as-is) is loaded as NULL rather than
+# failing the cast, and so the whole load.
+_ISO_DATE_RE = r"^\d{4}-\d{2}-\d{2}$"
+
+
+def _to_column(values: pa.Array, type_: pa.DataType) -> pa.Array:
+    """Cast one JSON-read column to its output type."""
+    if type_ == pa.date32():
+        iso = pc.match_substring_regex(values, _ISO_DATE_RE)
+        values = pc.if_else(iso, values, pa.scalar(None, pa.string()))
+    return values.cast(type_)
+
+
+def jsonl_to_parquet(jsonl_path: Path, schema: Sequence[bigquery.SchemaField]) -> Path:
+    """Convert a parsed JSONL file to a zstd Parquet file next to it.
+
+    Columns are typed from the BigQuery *schema*; fields the schema does not
+    list are dropped.  The file is streamed in blocks, so memory stays flat.
+    DATE columns are read as strings and cast, as the Arrow JSON reader
+    does not parse dates itself; values not in YYYY-MM-DD form become NULL.
+    Rows with a NULL in a REQUIRED column would fail the whole load job, so
+    they are dropped here and counted in a warning.
+    """
+    required = [f.name for f in schema if f.mode == "REQUIRED"]
+    out_schema = pa.schema([(f.name, _ARROW_TYPES.get(f.field_type, pa.string())) for f in schema])
+    read_schema = pa.schema([
+        (field.name, pa.string() if field.type == pa.date32() else field.type)
+        for field in out_schema
+    ])
+    reader = pj.open_json(
+        jsonl_path,
+        read_options=pj.ReadOptions(block_size=16 << 20),
+        parse_options=pj.ParseOptions(
+            explicit_schema=read_schema, unexpected_field_behavior="ignore",
+        ),
     )
-    return load_job
+
+    out_path = jsonl_path.with_suffix(".parquet")
+    tmp = out_path.with_suffix(".parquet.part")
+    dropped = 0
+    with pq.ParquetWriter(tmp, out_schema, compression="zstd") as writer:
+        for batch in reader:
+            if required:
+                complete = functools.reduce(
+                    pc.and_, (pc.is_valid(batch.column(name)) for name in required),
+                )
+                kept = batch.filter(complete)
+                dropped += batch.num_rows - kept.num_rows
+                batch = kept
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [_to_column(batch.column(f.name), f.type) for f in out_schema], schema=out_schema,
+            ))
+    tmp.replace(out_path)
+    if dropped:
+        logger.warning(
+            "Dropped %d rows of %s with no value for a required column (%s)",
+            dropped, jsonl_path.name, ", ".join(required),
+        )
+    return out_path
+
+
+def _check_table_columns(
+    jsonl_path: Path,
+    schema: Sequence[bigquery.SchemaField],
+    table_name: str,
+) -> None:
+    """Raise RuntimeError if the parsed records have columns the table lacks.
+
+    The Parquet file only keeps the table's columns, so a table created
+    before the records gained columns would silently drop them.  The first
+    record is checked; ``setup_bigquery.py`` adds missing columns.
+    """
+    with open(jsonl_path, "rb") as f:
+        first = f.readline()
+    if not first.strip():
+        return
+    missing = json.loads(first).keys() - {f.name for f in schema}
+    if missing:
+        raise RuntimeError(
+            f"BigQuery table {table_name} lacks {len(missing)} column(s) of the "
+            f"parsed records (e.g. {', '.join(sorted(missing)[:3])}). "
+            "Run `python setup_bigquery.py` to add them, then load again."
+        )
+
+
+def _upload_as_parquet(jsonl_path: Path, table_name: str) -> str:
+    """Convert *jsonl_path* for *table_name*, upload it, and return the gs:// URI."""
+    table_ref = f"{GCP_PROJECT_ID}.{BQ_DATASET}.{table_name}"
+    schema = bq_client().get_table(table_ref).schema
+    _check_table_columns(jsonl_path, schema, table_name)
+    parquet_path = jsonl_to_parquet(jsonl_path, schema)
+    return upload_to_gcs(parquet_path, f"staging/{parquet_path.name}")
 
 
 # ── Convenience: upload + load for each table ─────────────────────────────
 
 
-def load_organizations() -> None:
-    """Upload and load organizations.jsonl into BigQuery."""
-    local = PARSED_DIR / "organizations.jsonl"
+def load_organizations(wait: bool = True) -> bigquery.LoadJob | None:
+    """Upload and load organizations.parquet into BigQuery."""
+    local = PARSED_DIR / "organizations.parquet"
     if not local.exists():
-        logger.error("organizations.jsonl not found. Run download_bmf.py first.")
-        return
-    gcs_uri = upload_to_gcs(local, "staging/organizations.jsonl")
-    load_jsonl_to_bq(gcs_uri, BQ_TABLE_ORGANIZATIONS)
+        logger.error("organizations.parquet not found. Run download_bmf.py first.")
+        return None
+    gcs_uri = upload_to_gcs(local, "staging/organizations.parquet")
+    return load_parquet_to_bq(gcs_uri, BQ_TABLE_ORGANIZATIONS, wait=wait)
 
 
-def load_filings() -> None:
-    """Upload and load filings.jsonl into BigQuery."""
+def load_filings(wait: bool = True) -> bigquery.LoadJob | None:
+    """Convert, upload and load filings.jsonl into BigQuery."""
     local = PARSED_DIR / "filings.jsonl"
     if not local.exists():
         logger.error("filings.jsonl not found. Run parse_990.py first.")
-        return
-    gcs_uri = upload_to_gcs(local, "staging/filings.jsonl")
-    load_jsonl_to_bq(gcs_uri, BQ_TABLE_FILINGS)
+        return None
+    gcs_uri = _upload_as_parquet(local, BQ_TABLE_FILINGS)
+    return load_parquet_to_bq(
+        gcs_uri, BQ_TABLE_FILINGS, wait=wait, range_partitioning=_TAX_YEAR_PARTITIONING,
+    )
 
 
-def load_schedule_m() -> None:
-    """Upload and load schedule_m.jsonl into BigQuery."""
+def load_schedule_m(wait: bool = True) -> bigquery.LoadJob | None:
+    """Convert, upload and load schedule_m.jsonl into BigQuery."""
     local = PARSED_DIR / "schedule_m.jsonl"
     if not local.exists():
         logger.error("schedule_m.jsonl not found. Run parse_990.py first.")
-        return
-    gcs_uri = upload_to_gcs(local, "staging/schedule_m.jsonl")
-    load_jsonl_to_bq(gcs_uri, BQ_TABLE_SCHEDULE_M)
+        return None
+    gcs_uri = _upload_as_parquet(local, BQ_TABLE_SCHEDULE_M)
+    return load_parquet_to_bq(
+        gcs_uri, BQ_TABLE_SCHEDULE_M, wait=wait, range_partitioning=_TAX_YEAR_PARTITIONING,
+    )
+
+
+# ── Incremental merge ────────────────────────────────────────────────────
+
+
+def merge_jsonl_to_bq(local_path: Path, table_name: str) -> int:
+    """Insert the rows of a JSONL file whose object_id is not yet in the table.
+
+    The file is loaded into a ``<table>_staging`` table with the target's
+    schema, merged with ``MERGE … WHEN NOT MATCHED THEN INSERT ROW``, and
+    the staging table is dropped.  Only the delta is written, instead of
+    truncating and reloading the whole table.  Returns the rows inserted.
+    """
+    client = bq_client()
+    table_ref = f"{GCP_PROJECT_ID}.{BQ_DATASET}.{table_name}"
+    staging_ref = f"{table_ref}_staging"
+
+    gcs_uri = _upload_as_parquet(local_path, table_name)
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
+        write_disposition="WRITE_TRUNCATE",
+        schema=client.get_table(table_ref).schema,
+    )
+    _start_load(client, gcs_uri, staging_ref, job_config, wait=True)
+
+    try:
+        # A delta can repeat an object_id if an interrupted parse was re-run
+        merge_job = client.query(f"""MERGE `{table_ref}` AS t
+USING (
+    SELECT * FROM `{staging_ref}`
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY object_id) = 1
+) AS s
+ON t.object_id = s.object_id
+WHEN NOT MATCHED THEN INSERT ROW""")
+        merge_job.result()
+    finally:
+        client.delete_table(staging_ref, not_found_ok=True)
+
+    inserted = merge_job.num_dml_affected_rows or 0
+    logger.info("Merged %d new rows into %s.%s", inserted, BQ_DATASET, table_name)
+    return inserted
+
+
+def _merge_delta(name: str, table_name: str) -> int:
+    """Merge ``<name>_delta.jsonl`` into *table_name*, then remove the delta."""
+    delta = PARSED_DIR / f"{name}_delta.jsonl"
+    if not delta.exists() or delta.stat().st_size == 0:
+        logger.info("No new %s rows to merge.", name)
+        return 0
+    inserted = merge_jsonl_to_bq(delta, table_name)
+    delta.unlink()
+    return inserted
+
+
+def merge_filings() -> int:
+    """Merge newly parsed filings (filings_delta.jsonl) into BigQuery."""
+    return _merge_delta("filings", BQ_TABLE_FILINGS)
+
+
+def merge_schedule_m() -> int:
+    """Merge newly parsed Schedule M rows (schedule_m_delta.jsonl) into BigQuery."""
+    return _merge_delta("schedule_m", BQ_TABLE_SCHEDULE_M)
 
 
 def load_all() -> None:
-    """Upload and load all three tables."""
-    load_organizations()
-    load_filings()
-    load_schedule_m()
+    """Upload and load all three tables.
+
+    The tables are independent, so the three uploads run concurrently and
+    all load jobs are submitted before waiting on any of them.
+    """
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [
+            pool.submit(loader, wait=False)
+            for loader in (load_organizations, load_filings, load_schedule_m)
+        ]
+        jobs = [future.result() for future in futures]
+    for job in jobs:
+        if job is not None:
+            wait_for_load(job)
 
 
 if __name__ == "__main__":
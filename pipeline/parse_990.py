@@ -2,7 +2,8 @@
 """Parse 990 XML e-files and extract header, financial summary, and Schedule M.
 
 Reads XML files from ``data/xml/`` and writes two JSONL files:
-  * ``data/parsed/filings.jsonl``   — header + Part I summary + contact info
+  * ``data/parsed/filings.jsonl``   — header + Part I summary + contact info,
+    with the filing's Schedule M columns denormalised into the same row
   * ``data/parsed/schedule_m.jsonl`` — Schedule M noncash contribution details
 
 The parser uses the Master Concordance File (via ``concordance.py``) to
@@ -13,11 +14,21 @@ concordance xpaths and direct element-name matching as a fallback.
 
 from __future__ import annotations
 
-import json
+import io
 import logging
-import multiprocessing as mp
-from pathlib import Path
-
+import mmap
+import os
+import re
+import shutil
+import sys
+import zipfile
+from collections.abc import Callable, Collection, Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path, PurePosixPath
+from typing import IO
+
+import orjson
 from lxml import etree
 
 from pipeline.concordance import get_all_xpath_maps
@@ -29,21 +40,149 @@ from pipeline.config import (
 
 logger = logging.getLogger(__name__)
 
-# Common IRS 990 XML namespaces (varies by version)
-_NS_PREFIXES = [
-    "",  # Try without namespace first
-    "{http://www.irs.gov/efile}",
-]
+# What the parsers read: a filesystem path, or a binary file-like object.
+XmlSource = str | os.PathLike[str] | IO[bytes]
+
+# One parser for every file: no ID table, no ignorable whitespace nodes, no
+# entity expansion and no network access.  lxml parsers are safe to reuse
+# within a process.  The streaming Schedule M reader uses the same options.
+# Malformed files are rejected rather than recovered, so a truncated download
+# never yields a partial record.
+_PARSER_OPTIONS = dict(
+    collect_ids=False,
+    remove_blank_text=True,
+    resolve_entities=False,
+    huge_tree=False,
+    no_network=True,
+)
+_PARSER = etree.XMLParser(**_PARSER_OPTIONS)
+
+# Below this size mapping a file costs more than it saves.
+_MMAP_MIN_SIZE = 256 * 1024
+
+# IRS e-file documents declare this as their default namespace.  Concordance
+# xpaths are written without a prefix, so they are compiled to also try
+# each step in this namespace (see ``_compile_xpath``).
+IRS_NS = "http://www.irs.gov/efile"
+_XPATH_NS = {"efile": IRS_NS}
+_XPATH_STEP_RE = re.compile(r"[A-Za-z_][\w.\-]*(\[[^\]]*\])?")
+
+# The default-namespace declaration on the root <Return> start tag is
+# blanked out before parsing: the tree is then built without namespace
+# resolution and with shorter tags, and every lookup matches elements with
+# or without the namespace.
+_ROOT_XMLNS_RE = re.compile(rb'<Return\b[^>]*?(\sxmlns="http://www\.irs\.gov/efile")')
+_XMLNS_SCAN = 4096  # the root start tag sits in the first few hundred bytes
+
+# ElementPath ".//{*}Name" patterns (any namespace, or none) by local name,
+# so lookups don't format a new path string on every call.
+_DESCENDANT_PATHS: dict[str, str] = {
+    name: f".//{{*}}{name}"
+    for name in ("ReturnData", "IRS990ScheduleM", "ScheduleM")
+}
+
+
+def _structural_xpath(path: str) -> etree.XPath:
+    """Compile a relative element path matching with or without the IRS namespace."""
+    namespaced = "/".join(f"efile:{step}" for step in path.split("/"))
+    return etree.XPath(f"{namespaced} | {path}", namespaces=_XPATH_NS)
+
+
+# Fixed positions in the e-file layout (ReturnHeader / ReturnData under
+# Return, schedules under ReturnData), compiled once.  A child-axis step
+# replaces a scan over every descendant; ``_find_element``'s ``.//{*}``
+# search remains the fallback for documents laid out differently.
+_XP_RETURN_DATA = _structural_xpath("ReturnData")
+_XP_FILER_EIN = _structural_xpath("ReturnHeader/Filer/EIN")
+_XP_SCHEDULE_M = (
+    _structural_xpath("IRS990ScheduleM"),
+    _structural_xpath("ScheduleM"),
+)
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────
 
 
-def _find_text(root: etree._Element, xpaths: list[str]) -> str | None:
-    """Try a list of xpaths and return the first matching text value."""
+def _root_tag_end(buf: bytearray | mmap.mmap) -> int:
+    """Return the offset of the ``>`` closing the root start tag (-1 if not seen).
+
+    Skips the XML declaration, comments and DOCTYPE, and looks no further
+    than ``_XMLNS_SCAN`` bytes.
+    """
+    pos = 0
+    while (lt := buf.find(b"<", pos, _XMLNS_SCAN)) != -1:
+        if buf[lt + 1:lt + 2] not in (b"?", b"!"):
+            return buf.find(b">", lt, _XMLNS_SCAN)
+        pos = lt + 1
+    return -1
+
+
+def _blank_root_xmlns(buf: bytearray | mmap.mmap) -> None:
+    """Overwrite the root's IRS default-namespace declaration with spaces.
+
+    Only the root start tag is searched, so the cost does not grow with the
+    file.  A nested element redeclaring the namespace keeps its subtree
+    namespaced; the local-name lookups still find its fields.
+    """
+    end = _root_tag_end(buf)
+    if end == -1:
+        return
+    m = _ROOT_XMLNS_RE.search(buf, 0, end + 1)
+    if m is not None:
+        start, end = m.span(1)
+        buf[start:end] = b" " * (end - start)
+
+
+def _parse_xml(source: XmlSource) -> etree._Element | None:
+    """Parse an XML file or stream with the shared parser; None if malformed.
+
+    Files over ``_MMAP_MIN_SIZE`` are memory-mapped copy-on-write and parsed
+    from the mapping, so the kernel pages them in on demand; only the page
+    holding the blanked namespace declaration is copied.
+    """
+    try:
+        if hasattr(source, "read"):
+            buf = bytearray(source.read())
+        elif os.stat(source).st_size > _MMAP_MIN_SIZE:
+            with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY) as mm:
+                _blank_root_xmlns(mm)
+                return etree.fromstring(mm, parser=_PARSER)
+        else:
+            with open(source, "rb") as f:
+                buf = bytearray(f.read())
+        _blank_root_xmlns(buf)
+        return etree.fromstring(buf, parser=_PARSER)
+    except Exception:
+        logger.debug("Failed to parse XML: %s", source, exc_info=True)
+        return None
+
+
+def _compile_xpath(xpath: str) -> etree.XPath | None:
+    """Compile a concordance xpath so it matches with or without the IRS namespace.
+
+    ``/Return/ReturnHeader/TaxYr`` becomes
+    ``/Return/ReturnHeader/TaxYr | /efile:Return/efile:ReturnHeader/efile:TaxYr``.
+    Paths with steps other than plain element names are compiled as-is.
+    Returns None if the xpath does not compile.
+    """
+    steps = xpath.split("/")
+    if all(not step or _XPATH_STEP_RE.fullmatch(step) for step in steps):
+        namespaced = "/".join(f"efile:{step}" if step else step for step in steps)
+        expr = f"{xpath} | {namespaced}"
+    else:
+        expr = xpath
+    try:
+        return etree.XPath(expr, namespaces=_XPATH_NS)
+    except etree.XPathError:
+        logger.debug("Skipping invalid concordance xpath: %s", xpath)
+        return None
+
+
+def _find_text(root: etree._Element, xpaths: Sequence[etree.XPath]) -> str | None:
+    """Try a list of compiled xpaths and return the first matching text value."""
     for xpath in xpaths:
         try:
-            elems = root.xpath(xpath)
+            elems = xpath(root)
             if elems:
                 if isinstance(elems[0], etree._Element):
                     text = elems[0].text
@@ -59,57 +198,119 @@ def _find_text(root: etree._Element, xpaths: list[str]) -> str | None:
 def _find_element(root: etree._Element, local_names: list[str]) -> etree._Element | None:
     """Find the first element matching any of the given local names (ignoring namespace)."""
     for name in local_names:
-        for prefix in _NS_PREFIXES:
-            elems = root.findall(f".//{prefix}{name}")
-            if elems:
-                return elems[0]
+        path = _DESCENDANT_PATHS.get(name)
+        if path is None:
+            path = _DESCENDANT_PATHS[name] = f".//{{*}}{name}"
+        el = root.find(path)
+        if el is not None:
+            return el
+    return None
+
+
+def _first_match(parent: etree._Element, xpaths: Sequence[etree.XPath]) -> etree._Element | None:
+    """Return the first element found by any of the compiled *xpaths*, in order."""
+    for xpath in xpaths:
+        found = xpath(parent)
+        if found:
+            return found[0]
     return None
 
 
-def _el_text(parent: etree._Element | None, local_names: list[str]) -> str | None:
-    """Get text from a child element matching any of the given local names.
+# Qualified tag → interned local name.  The e-file schemas use a few
+# thousand distinct tags, so after the first files every element's local
+# name is a dict hit instead of an rpartition and three new strings, and
+# all indexes share one copy of each name.
+_LOCAL_NAMES: dict[str, str] = {}
+
+
+def _local_name(tag: str) -> str:
+    """Strip the namespace from *tag*, caching the interned result."""
+    local = _LOCAL_NAMES[tag] = sys.intern(tag.rpartition("}")[2])
+    return local
+
 
-    Uses both namespace-aware and local-name() xpath matching to handle
-    the IRS namespace.
+def _index_by_local_name(parent: etree._Element) -> dict[str, list[etree._Element]]:
+    """Map each descendant's local name (namespace stripped) to its elements.
+
+    One walk over the subtree, in document order, so later lookups are plain
+    dict accesses instead of repeated ``findall`` / xpath traversals.
     """
-    if parent is None:
-        return None
+    index: dict[str, list[etree._Element]] = {}
+    local_names = _LOCAL_NAMES
+    for el in parent.iterdescendants(etree.Element):
+        tag = el.tag
+        local = local_names.get(tag) or _local_name(tag)
+        index.setdefault(local, []).append(el)
+    return index
+
+
+def _index_with_subtrees(
+    parent: etree._Element,
+    names: Collection[str],
+) -> tuple[dict[str, list[etree._Element]], dict[str, dict[str, list[etree._Element]]]]:
+    """``_index_by_local_name(parent)``, plus the index of selected children.
+
+    Children of *parent* whose local name is in *names* (first of each name)
+    get their own descendant index, built during the same walk and then
+    merged into the main one, so their subtrees are not walked twice.
+    """
+    index: dict[str, list[etree._Element]] = {}
+    subtrees: dict[str, dict[str, list[etree._Element]]] = {}
+    local_names = _LOCAL_NAMES
+    for child in parent.iterchildren(etree.Element):
+        tag = child.tag
+        local = local_names.get(tag) or _local_name(tag)
+        index.setdefault(local, []).append(child)
+        if local in names and local not in subtrees:
+            sub = subtrees[local] = _index_by_local_name(child)
+            for name, els in sub.items():
+                index.setdefault(name, []).extend(els)
+        else:
+            for el in child.iterdescendants(etree.Element):
+                tag = el.tag
+                local = local_names.get(tag) or _local_name(tag)
+                index.setdefault(local, []).append(el)
+    return index, subtrees
+
+
+def _index_text(index: dict[str, list[etree._Element]], local_names: Sequence[str]) -> str | None:
+    """Return the text of the first indexed element matching any of *local_names*."""
     for name in local_names:
-        # Try with each known namespace prefix
-        for prefix in _NS_PREFIXES:
-            el = parent.find(f".//{prefix}{name}")
-            if el is not None and el.text:
-                return el.text.strip()
-        # Fallback: match by local-name() (ignores namespace entirely)
-        try:
-            els = parent.xpath(f".//*[local-name()='{name}']")
-            if els and els[0].text:
-                return els[0].text.strip()
-        except Exception:
-            pass
+        els = index.get(name)
+        if els and els[0].text:
+            return els[0].text.strip()
     return None
 
 
+_INT_RE = re.compile(r"[+-]?\d+")
+
+
 def _safe_int(val: str | None) -> int | None:
-    if val is None:
+    if not val:
         return None
-    val = val.strip().replace(",", "")
-    try:
+    val = val.strip()
+    if val.isdecimal():
+        return int(val)  # the common case: plain digits, no sign or commas
+    val = val.replace(",", "")
+    if _INT_RE.fullmatch(val):
         return int(val)
-    except (ValueError, TypeError):
-        try:
-            return int(float(val))
-        except (ValueError, TypeError):
-            return None
+    try:
+        return int(float(val))
+    except (ValueError, OverflowError):
+        return None
+
+
+_BOOL_TRUE = frozenset({"1", "TRUE", "X", "YES", "Y"})
+_BOOL_FALSE = frozenset({"0", "FALSE", "NO", "N", ""})
 
 
 def _safe_bool(val: str | None) -> bool | None:
     if val is None:
         return None
     val = val.strip().upper()
-    if val in ("1", "TRUE", "X", "YES", "Y"):
+    if val in _BOOL_TRUE:
         return True
-    if val in ("0", "FALSE", "NO", "N", ""):
+    if val in _BOOL_FALSE:
         return False
     return None
 
@@ -126,97 +327,165 @@ def _safe_date(val: str | None) -> str | None:
     return val
 
 
+def _normalize_ein(val: str | None) -> str | None:
+    """Return the EIN as 9 zero-padded digits; None if missing or not numeric."""
+    if not val:
+        return None
+    val = val.strip().replace("-", "")
+    if not val.isdecimal():
+        return None
+    return val.zfill(9)  # returns *val* itself when already 9 digits
+
+
 # ── Filing parser ─────────────────────────────────────────────────────────
 
-# The xpath maps are loaded once when the module is first imported.
-_XPATH_MAPS: dict[str, dict[str, list[str]]] | None = None
+# Converters applied to extracted text, by output column; columns not listed
+# are kept as (stripped) strings.
+_FIELD_CONVERTERS: dict[str, Callable[[str | None], object]] = {
+    "ein": _normalize_ein,
+    "tax_year": _safe_int,
+    "year_formation": _safe_int,
+    "tax_period_begin": _safe_date,
+    "tax_period_end": _safe_date,
+    **dict.fromkeys((
+        "num_voting_members", "num_voting_members_independent",
+        "num_employees", "num_volunteers",
+        "contributions_grants_cy", "program_service_revenue_cy",
+        "investment_income_cy", "other_revenue_cy",
+        "total_revenue_cy", "total_revenue_py",
+        "grants_similar_cy", "salaries_cy",
+        "total_expenses_cy", "total_expenses_py",
+        "revenue_less_expenses_cy",
+        "total_assets_boy", "total_assets_eoy",
+        "total_liabilities_boy", "total_liabilities_eoy",
+        "net_assets_boy", "net_assets_eoy",
+    ), _safe_int),
+}
+
+# (column, compiled xpaths, local-name fallbacks, converter) for every
+# header, signature and summary column, built once from the concordance.
+_FieldSpec = tuple[
+    str, tuple[etree.XPath, ...], tuple[str, ...], Callable[[str | None], object] | None
+]
+_FIELD_SPECS: tuple[_FieldSpec, ...] | None = None
+
+
+def _get_field_specs() -> tuple[_FieldSpec, ...]:
+    global _FIELD_SPECS
+    if _FIELD_SPECS is None:
+        compiled: dict[str, etree.XPath | None] = {}
+        specs: list[_FieldSpec] = []
+        for xpath_map in get_all_xpath_maps().values():
+            for col, xpaths in xpath_map.items():
+                for xp in xpaths:
+                    if xp not in compiled:
+                        compiled[xp] = _compile_xpath(xp)
+                specs.append((
+                    col,
+                    tuple(compiled[xp] for xp in xpaths if compiled[xp] is not None),
+                    tuple(dict.fromkeys(xp.rstrip("/").rsplit("/", 1)[-1] for xp in xpaths)),
+                    _FIELD_CONVERTERS.get(col),
+                ))
+        _FIELD_SPECS = tuple(specs)
+    return _FIELD_SPECS
+
 
+_FILING_TEMPLATE: dict | None = None
 
-def _get_xpath_maps() -> dict[str, dict[str, list[str]]]:
-    global _XPATH_MAPS
-    if _XPATH_MAPS is None:
-        _XPATH_MAPS = get_all_xpath_maps()
-    return _XPATH_MAPS
 
+def _filing_template() -> dict:
+    """Return an all-None filing row in column order, for records to copy.
 
-def _extract_field(root: etree._Element, xpaths: list[str]) -> str | None:
-    """Try concordance xpaths, then fall back to local-name matching."""
+    Copying a prebuilt dict clones its hash table in one allocation,
+    instead of growing a fresh dict key by key.
+    """
+    global _FILING_TEMPLATE
+    if _FILING_TEMPLATE is None:
+        _FILING_TEMPLATE = dict.fromkeys((
+            "object_id",
+            "form_type",
+            *(spec[0] for spec in _get_field_specs()),
+            "noncash_contributions_total",
+            "has_schedule_m",
+        ))
+    return _FILING_TEMPLATE
+
+
+def _extract_field(
+    root: etree._Element,
+    xpaths: Sequence[etree.XPath],
+    local_names: Sequence[str],
+    index: dict[str, list[etree._Element]],
+) -> str | None:
+    """Try concordance xpaths, then fall back to local-name matching.
+
+    *xpaths* are compiled (see ``_compile_xpath``), *local_names* are their
+    last steps and *index* is ``_index_by_local_name(root)``.
+    """
     # Try concordance xpaths
     val = _find_text(root, xpaths)
     if val:
         return val
 
     # Fallback: try the last part of each xpath as a local element name
-    for xpath in xpaths:
-        parts = xpath.rstrip("/").split("/")
-        if parts:
-            local = parts[-1]
-            for prefix in _NS_PREFIXES:
-                elems = root.findall(f".//{prefix}{local}")
-                if elems and elems[0].text:
-                    return elems[0].text.strip()
+    for local in local_names:
+        els = index.get(local)
+        if els and els[0].text:
+            return els[0].text.strip()
     return None
 
 
-def parse_filing(xml_path: Path, object_id: str) -> dict | None:
-    """Parse a single 990 XML file and return a filing dict (or None on error)."""
-    try:
-        tree = etree.parse(str(xml_path))
-    except Exception:
-        logger.debug("Failed to parse XML: %s", xml_path, exc_info=True)
-        return None
-
-    root = tree.getroot()
-    maps = _get_xpath_maps()
-
-    # Find the Return/ReturnData container
-    return_data = _find_element(root, ["ReturnData"])
-    search_root = return_data if return_data is not None else root
-
-    filing: dict = {"object_id": object_id, "form_type": "990"}
+def parse_filing(
+    source: XmlSource,
+    object_id: str,
+    root: etree._Element | None = None,
+) -> dict | None:
+    """Parse a single 990 XML file and return a filing dict (or None on error).
 
-    # ── Header fields ──
-    for col, xpaths in maps["header"].items():
-        val = _extract_field(search_root, xpaths)
-        if col == "tax_year":
-            filing[col] = _safe_int(val)
-        elif col in ("tax_period_begin", "tax_period_end"):
-            filing[col] = _safe_date(val)
-        elif col == "year_formation":
-            filing[col] = _safe_int(val)
-        else:
-            filing[col] = val
+    *source* is a path or a binary file-like object.  Pass an already-parsed
+    *root* to avoid re-reading it.
+    """
+    if root is None:
+        root = _parse_xml(source)
+        if root is None:
+            return None
+    search_root = _search_root(root)
+    return _filing_record(root, search_root, _index_by_local_name(search_root), object_id)
+
+
+def _search_root(root: etree._Element) -> etree._Element:
+    """Return the Return/ReturnData container, or *root* if there is none."""
+    return_data = _first_match(root, (_XP_RETURN_DATA,))
+    if return_data is None:
+        return_data = _find_element(root, ["ReturnData"])
+    return return_data if return_data is not None else root
+
+
+def _filing_record(
+    root: etree._Element,
+    search_root: etree._Element,
+    index: dict[str, list[etree._Element]],
+    object_id: str,
+) -> dict:
+    """Build the filing dict; *index* is ``_index_by_local_name(search_root)``."""
+    filing = _filing_template().copy()
+    filing["object_id"] = object_id
+    filing["form_type"] = "990"
+
+    # ── Header, signature / contact and Part I summary fields ──
+    for col, xpaths, local_names, convert in _get_field_specs():
+        val = _extract_field(search_root, xpaths, local_names, index)
+        filing[col] = convert(val) if convert is not None else val
 
     # Fall back: extract EIN from the Return header if not found
     if not filing.get("ein"):
-        ein_el = _find_element(root, ["Filer/EIN", "EIN"])
-        if ein_el is not None and ein_el.text:
-            filing["ein"] = ein_el.text.strip().zfill(9)
-
-    # ── Signature / contact fields ──
-    for col, xpaths in maps["signature"].items():
-        filing[col] = _extract_field(search_root, xpaths)
-
-    # ── Summary financial fields (Part I) ──
-    _INT_SUMMARY = {
-        "num_voting_members", "num_voting_members_independent",
-        "num_employees", "num_volunteers",
-        "contributions_grants_cy", "program_service_revenue_cy",
-        "investment_income_cy", "other_revenue_cy",
-        "total_revenue_cy", "total_revenue_py",
-        "grants_similar_cy", "salaries_cy",
-        "total_expenses_cy", "total_expenses_py",
-        "revenue_less_expenses_cy",
-        "total_assets_boy", "total_assets_eoy",
-        "total_liabilities_boy", "total_liabilities_eoy",
-        "net_assets_boy", "net_assets_eoy",
-    }
-    for col, xpaths in maps["summary"].items():
-        val = _extract_field(search_root, xpaths)
-        if col in _INT_SUMMARY:
-            filing[col] = _safe_int(val)
-        else:
-            filing[col] = val
+        ein_el = _first_match(root, (_XP_FILER_EIN,))
+        if ein_el is None:
+            ein_el = root.find(".//{*}Filer/{*}EIN")
+        if ein_el is None:
+            ein_el = next(root.iter("{*}EIN"), None)
+        if ein_el is not None:
+            filing["ein"] = _normalize_ein(ein_el.text)
 
     # ── Noncash total (Part VIII Line 1g) ──
     noncash_names = [
@@ -224,31 +493,43 @@ def parse_filing(xml_path: Path, object_id: str) -> dict | None:
         "NoncashContributions",
         "AllOtherContributionsAmt",
     ]
-    noncash_val = _el_text(search_root, noncash_names)
+    noncash_val = _index_text(index, noncash_names)
     filing["noncash_contributions_total"] = _safe_int(noncash_val)
 
-    # ── Has Schedule M? (Part IV lines 29/30) ──
-    # The IRS uses DeductibleNonCashContriInd in recent schemas.
-    sched_m_names = [
-        "DeductibleNonCashContriInd",
-        "DeductibleArtContributionInd",
-        "NoncashContributionsInd",
-        "MoreThan25KNoncashInd",
-        "ArtHistTreasuresContribInd",
-        "MoreThan25000",
-        "ArtHistTreasuresContrib",
-    ]
-    sched_m_val = None
-    for name in sched_m_names:
-        v = _el_text(search_root, [name])
-        if v:
-            sched_m_val = v
-            break
-    filing["has_schedule_m"] = _safe_bool(sched_m_val)
+    filing["has_schedule_m"] = _schedule_m_indicator(index)
 
     return filing
 
 
+# Part IV lines 29/30 ("Has Schedule M?").  The IRS uses
+# DeductibleNonCashContriInd in recent schemas.
+_SCHED_M_INDICATOR_NAMES = (
+    "DeductibleNonCashContriInd",
+    "DeductibleArtContributionInd",
+    "NoncashContributionsInd",
+    "MoreThan25KNoncashInd",
+    "ArtHistTreasuresContribInd",
+    "MoreThan25000",
+    "ArtHistTreasuresContrib",
+)
+
+
+def _schedule_m_indicator(index: dict[str, list[etree._Element]]) -> bool | None:
+    """Return the filing's Part IV Schedule M answer (None if not stated).
+
+    Schedule M is required if either line 29 or line 30 is answered "yes",
+    so any true indicator wins over the others.
+    """
+    answer = None
+    for name in _SCHED_M_INDICATOR_NAMES:
+        v = _safe_bool(_index_text(index, (name,)))
+        if v:
+            return True
+        if v is False:
+            answer = False
+    return answer
+
+
 # ── Schedule M parser ─────────────────────────────────────────────────────
 
 # Mapping from our prefix → IRS XML element name patterns for each property
@@ -288,6 +569,21 @@ _SCHED_M_LINE_NAMES: dict[str, list[str]] = {
     "other_4":                    ["OtherNoncashContri28", "OtherNoncashContriTable28Grp"],
 }
 
+# Local name → (prefix, preference) for the fixed property-type lines, so a
+# single pass over the Schedule M index finds every line group present.  The
+# "other_*" lines are matched positionally in ``parse_schedule_m`` instead.
+_GRP_NAME_TO_PREFIX: dict[str, tuple[str, int]] = {
+    ln: (prefix, rank)
+    for prefix, names in _SCHED_M_LINE_NAMES.items()
+    if not prefix.startswith("other_")
+    for rank, ln in enumerate(names)
+}
+
+_OTHER_PREFIXES: tuple[str, ...] = tuple(
+    prefix for _line, prefix, _desc in SCHEDULE_M_PROPERTY_TYPES
+    if prefix.startswith("other_")
+)
+
 # Child element names for checkbox / count / amount / method within each
 # property-type group element.
 _CHECKBOX_NAMES = [
@@ -312,192 +608,485 @@ _DESC_NAMES = [
     "Desc", "Description", "TypeDesc",
 ]
 
+# (column suffix, child element names, converter) for each field of a
+# property-type group; lines 25-28 also carry a free-text description.
+_GroupField = tuple[str, Sequence[str], Callable[[str | None], object] | None]
+_GROUP_FIELDS: tuple[_GroupField, ...] = (
+    ("x", _CHECKBOX_NAMES, _safe_bool),
+    ("count", _COUNT_NAMES, _safe_int),
+    ("amount", _AMOUNT_NAMES, _safe_int),
+    ("method", _METHOD_NAMES, None),
+)
+_OTHER_GROUP_FIELDS: tuple[_GroupField, ...] = (*_GROUP_FIELDS, ("desc", _DESC_NAMES, None))
+
+# Per property type, its output columns with their element names and
+# converter, so the group loop never formats a column name.
+_SCHED_M_GROUP_COLUMNS: dict[str, tuple[_GroupField, ...]] = {
+    prefix: tuple(
+        (f"{prefix}_{suffix}", names, convert)
+        for suffix, names, convert in (
+            _OTHER_GROUP_FIELDS if prefix.startswith("other_") else _GROUP_FIELDS
+        )
+    )
+    for _line, prefix, _desc in SCHEDULE_M_PROPERTY_TYPES
+}
+
+# Every property-type column in output order.
+_SCHED_M_LINE_COLUMNS: tuple[str, ...] = tuple(
+    col for fields in _SCHED_M_GROUP_COLUMNS.values() for col, _names, _convert in fields
+)
+
+# Summary questions (lines 29-32), in the same (column, names, converter)
+# form as the property-type columns.
+_SCHED_M_SUMMARY_COLUMNS: tuple[_GroupField, ...] = (
+    ("num_forms_8283", (
+        "Form8283ReceivedCnt", "NumberOf8283Received", "NumberOf8283ReceivedCnt",
+    ), _safe_int),
+    ("hold_3_years_required", (
+        "AnyPropertyThatMustBeHeldInd", "AnyPropertyThatMustBeHeld",
+        "PropertyMustBeHeldInd",
+    ), _safe_bool),
+    ("gift_acceptance_policy", (
+        "ReviewProcessUnusualNCGiftsInd", "ReviewProcessUnusualNCGifts",
+        "GiftAcceptancePolicyInd",
+    ), _safe_bool),
+    ("uses_third_parties", (
+        "ThirdPartiesUsedInd", "ThirdPartiesUsed",
+        "HireOrUseThirdPartiesInd",
+    ), _safe_bool),
+)
+
+# Identifying columns a Schedule M record shares with its filing; the rest
+# are copied onto the filing row.
+_SCHED_M_KEY_COLUMNS = frozenset({"object_id", "ein", "tax_year"})
+
+# An all-None Schedule M row in column order; each record starts as a copy.
+_SCHED_M_TEMPLATE: dict = dict.fromkeys((
+    "object_id",
+    "ein",
+    "tax_year",
+    *_SCHED_M_LINE_COLUMNS,
+    *(col for col, _names, _convert in _SCHED_M_SUMMARY_COLUMNS),
+))
+
+# Container local names in preference order, and as iterparse tags in any
+# namespace (or none).  The stream also watches ReturnData, which holds the
+# schedules, and the Form 990 body, which precedes them.
+_SCHED_M_CONTAINERS = ("IRS990ScheduleM", "ScheduleM")
+_SCHED_M_TAGS = tuple(f"{{*}}{name}" for name in _SCHED_M_CONTAINERS)
+_STREAM_TAGS = ("{*}ReturnData", "{*}IRS990", *_SCHED_M_TAGS)
+
+# Substring of both container tags, in any namespace prefix.
+_SCHED_M_MARKER = b"ScheduleM"
+
+
+def _has_schedule_m(raw: bytes) -> bool:
+    """Cheap pre-check: False means *raw* cannot contain a Schedule M element.
 
-def parse_schedule_m(xml_path: Path, object_id: str, ein: str | None, tax_year: int | None) -> dict | None:
-    """Parse Schedule M from a 990 XML and return a flat dict (or None)."""
+    A byte-level substring search is far cheaper than starting the parser
+    only to learn the schedule is missing.  A True answer may be a false
+    positive (the text could appear in content); the parse decides.
+    """
+    return _SCHED_M_MARKER in raw
+
+
+def _read_source(source: XmlSource) -> bytes | None:
+    """Return the bytes of *source* (a path or binary stream); None if unreadable."""
     try:
-        tree = etree.parse(str(xml_path))
-    except Exception:
+        if hasattr(source, "read"):
+            return source.read()
+        with open(source, "rb") as f:
+            return f.read()
+    except OSError:
+        logger.debug("Failed to read XML: %s", source, exc_info=True)
         return None
 
-    root = tree.getroot()
 
-    # Find the Schedule M container
-    sched_m = None
-    for name in ["IRS990ScheduleM", "ScheduleM"]:
-        sched_m = _find_element(root, [name])
-        if sched_m is not None:
-            break
+def _stream_schedule_m(source: XmlSource) -> etree._Element | None:
+    """Stream *source* up to its Schedule M element and return it (or None).
 
-    if sched_m is None:
-        return None  # No Schedule M in this filing
+    ``iterparse`` only reports the watched tags, so no Python code runs per
+    element.  Parsing stops as soon as the preferred container closes, or
+    when ReturnData closes: nothing after the return data is read.
+    """
+    found = None
+    try:
+        with nullcontext(source) if hasattr(source, "read") else open(source, "rb") as f:
+            for _event, elem in etree.iterparse(
+                f,
+                events=("end",),
+                tag=_STREAM_TAGS,
+                **_PARSER_OPTIONS,
+            ):
+                tag = elem.tag
+                if tag.endswith("IRS990ScheduleM"):
+                    return elem
+                if tag.endswith("ReturnData"):
+                    return found
+                if tag.endswith("IRS990"):
+                    if found is None:
+                        elem.clear()  # the form body is not needed
+                elif found is None:
+                    found = elem
+    except (OSError, etree.XMLSyntaxError):
+        logger.debug("Failed to parse XML: %s", source, exc_info=True)
+        return None
+    return found
+
+
+def parse_schedule_m(
+    source: XmlSource,
+    object_id: str,
+    ein: str | None,
+    tax_year: int | None,
+    root: etree._Element | None = None,
+) -> dict | None:
+    """Parse Schedule M from a 990 XML and return a flat dict (or None).
+
+    *source* is a path or a binary file-like object.  Pass an already-parsed
+    *root* to avoid re-reading it; without one the input is read, skipped
+    if it lacks the Schedule M tag text, and otherwise streamed so only the
+    Schedule M subtree is examined.
+    """
+    if root is None:
+        raw = _read_source(source)
+        if raw is None or not _has_schedule_m(raw):
+            return None  # unreadable, or no Schedule M: skip the parse
+        sched_m = _stream_schedule_m(io.BytesIO(raw))
+    else:
+        # Find the Schedule M container: normally a child of ReturnData
+        return_data = _first_match(root, (_XP_RETURN_DATA,))
+        sched_m = None
+        if return_data is not None:
+            sched_m = _first_match(return_data, _XP_SCHEDULE_M)
+        if sched_m is None:
+            sched_m = _find_element(root, ["IRS990ScheduleM", "ScheduleM"])
 
-    record: dict = {
-        "object_id": object_id,
-        "ein": ein or "",
-        "tax_year": tax_year,
-    }
+    if sched_m is None:
+        return None  # No Schedule M in this filing (or unreadable XML)
+    return _schedule_m_record(_index_by_local_name(sched_m), object_id, ein, tax_year)
+
+
+def _schedule_m_record(
+    index: dict[str, list[etree._Element]],
+    object_id: str,
+    ein: str | None,
+    tax_year: int | None,
+) -> dict:
+    """Build the Schedule M dict from the index of the container's descendants."""
+    record = _SCHED_M_TEMPLATE.copy()
+    record["object_id"] = object_id
+    record["ein"] = ein or ""
+    record["tax_year"] = tax_year
 
     # ── Property types (lines 1-28) ──
-    # The IRS uses repeating OtherNonCashContriTableGrp elements for lines 25-28.
-    # Collect them all so we can assign to other_1..other_4 in order.
-    other_grps: list[etree._Element] = []
-    for tag in ["OtherNonCashContriTableGrp", "OtherNoncashContriTableGrp"]:
-        for prefix_ns in _NS_PREFIXES:
-            others = sched_m.findall(f".//{prefix_ns}{tag}")
-            if others:
-                other_grps.extend(others)
-                break
-        if other_grps:
-            break
-    # Also try local-name xpath
-    if not other_grps:
-        try:
-            other_grps = sched_m.xpath(".//*[local-name()='OtherNonCashContriTableGrp']")
-        except Exception:
-            pass
+    # One pass over the indexed names picks the preferred group element for
+    # each fixed line.
+    best: dict[str, tuple[int, etree._Element]] = {}
+    for name, els in index.items():
+        hit = _GRP_NAME_TO_PREFIX.get(name)
+        if hit is not None:
+            prefix, rank = hit
+            if prefix not in best or rank < best[prefix][0]:
+                best[prefix] = (rank, els[0])
+    groups = [(prefix, grp) for prefix, (_rank, grp) in best.items()]
 
-    other_idx = 0  # Index into other_grps
+    # The IRS uses repeating OtherNonCashContriTableGrp elements for lines 25-28.
+    # Assign them to other_1..other_4 in document order.
+    other_grps: list[etree._Element] = (
+        index.get("OtherNonCashContriTableGrp")
+        or index.get("OtherNoncashContriTableGrp")
+        or []
+    )
+    groups.extend(zip(_OTHER_PREFIXES, other_grps))
 
-    for _line, prefix, _desc in SCHEDULE_M_PROPERTY_TYPES:
-        grp = None
-
-        if prefix.startswith("other_"):
-            # Use the collected OtherNonCashContriTableGrp elements in order
-            if other_idx < len(other_grps):
-                grp = other_grps[other_idx]
-                other_idx += 1
-        else:
-            line_names = _SCHED_M_LINE_NAMES.get(prefix, [])
-            for ln in line_names:
-                grp = _find_element(sched_m, [ln])
-                if grp is not None:
-                    break
-
-        if grp is not None:
-            record[f"{prefix}_x"] = _safe_bool(
-                _el_text(grp, _CHECKBOX_NAMES)
-            )
-            record[f"{prefix}_count"] = _safe_int(
-                _el_text(grp, _COUNT_NAMES)
-            )
-            record[f"{prefix}_amount"] = _safe_int(
-                _el_text(grp, _AMOUNT_NAMES)
-            )
-            record[f"{prefix}_method"] = _el_text(grp, _METHOD_NAMES)
-
-            if prefix.startswith("other_"):
-                record[f"{prefix}_desc"] = _el_text(grp, _DESC_NAMES)
-        else:
-            record[f"{prefix}_x"] = None
-            record[f"{prefix}_count"] = None
-            record[f"{prefix}_amount"] = None
-            record[f"{prefix}_method"] = None
-            if prefix.startswith("other_"):
-                record[f"{prefix}_desc"] = None
+    for prefix, grp in groups:
+        grp_index = _index_by_local_name(grp)
+        for col, names, convert in _SCHED_M_GROUP_COLUMNS[prefix]:
+            val = _index_text(grp_index, names)
+            record[col] = convert(val) if convert is not None else val
 
     # ── Summary questions (lines 29-32) ──
-    record["num_forms_8283"] = _safe_int(
-        _el_text(sched_m, ["Form8283ReceivedCnt", "NumberOf8283Received", "NumberOf8283ReceivedCnt"])
-    )
-    record["hold_3_years_required"] = _safe_bool(
-        _el_text(sched_m, [
-            "AnyPropertyThatMustBeHeldInd", "AnyPropertyThatMustBeHeld",
-            "PropertyMustBeHeldInd",
-        ])
-    )
-    record["gift_acceptance_policy"] = _safe_bool(
-        _el_text(sched_m, [
-            "ReviewProcessUnusualNCGiftsInd", "ReviewProcessUnusualNCGifts",
-            "GiftAcceptancePolicyInd",
-        ])
-    )
-    record["uses_third_parties"] = _safe_bool(
-        _el_text(sched_m, [
-            "ThirdPartiesUsedInd", "ThirdPartiesUsed",
-            "HireOrUseThirdPartiesInd",
-        ])
-    )
+    for col, names, convert in _SCHED_M_SUMMARY_COLUMNS:
+        record[col] = convert(_index_text(index, names))
 
     return record
 
 
-# ── Batch parser (multiprocessing) ────────────────────────────────────────
+# ── Combined parser ───────────────────────────────────────────────────────
+
 
+def parse_both(source: XmlSource, object_id: str) -> tuple[dict | None, dict | None]:
+    """Parse *source* (a path or binary stream) once; return ``(filing, schedule_m)``.
 
-def _parse_one(args: tuple[Path, str]) -> tuple[dict | None, dict | None]:
-    """Worker function for multiprocessing: parse one XML into filing + schedule_m."""
-    xml_path, object_id = args
-    filing = parse_filing(xml_path, object_id)
-    sched_m = None
-    if filing:
-        sched_m = parse_schedule_m(
-            xml_path, object_id,
-            ein=filing.get("ein"),
-            tax_year=filing.get("tax_year"),
+    Both parsers share the one tree.  The filing also carries the Schedule M
+    columns (see ``setup_bigquery.filings_schema``); either dict is None when absent or
+    when the file cannot be parsed.
+    """
+    root = _parse_xml(source)
+    if root is None:
+        return None, None
+    # One walk over ReturnData indexes the filing fields and, on the way,
+    # the Schedule M container's own subtree.
+    search_root = _search_root(root)
+    index, subtrees = _index_with_subtrees(search_root, _SCHED_M_CONTAINERS)
+    filing = _filing_record(root, search_root, index, object_id)
+    # Schedule M is taken from the tree whatever Part IV says: the walk has
+    # already indexed it, and the indicators are not always consistent.
+    ein, tax_year = filing.get("ein"), filing.get("tax_year")
+    sched_m_index = next(
+        (subtrees[name] for name in _SCHED_M_CONTAINERS if name in subtrees), None,
+    )
+    if sched_m_index is None:
+        sched_m_el = next(
+            (index[name][0] for name in _SCHED_M_CONTAINERS if name in index), None,
+        )
+        if sched_m_el is not None:
+            sched_m_index = _index_by_local_name(sched_m_el)
+    if sched_m_index is not None:
+        sched_m = _schedule_m_record(sched_m_index, object_id, ein, tax_year)
+    elif search_root is not root:
+        # Not under ReturnData: search the rest of the document
+        sched_m = parse_schedule_m(source, object_id, ein, tax_year, root=root)
+    else:
+        sched_m = None
+    if sched_m:
+        # At most one Schedule M per filing, so carry it on the filing
+        # row as well: the prospecting build then skips a 1:1 join.
+        filing.update(
+            (k, v) for k, v in sched_m.items() if k not in _SCHED_M_KEY_COLUMNS
         )
     return filing, sched_m
 
 
+def parse_zip(
+    zip_source: str | os.PathLike[str] | IO[bytes],
+) -> Iterator[tuple[dict, dict | None]]:
+    """Parse every ``.xml`` member of an IRS e-file zip without extracting it.
+
+    Each member is read straight from the archive into ``parse_both`` and
+    yields ``(filing, schedule_m)``; members that fail to parse are skipped.
+    """
+    with zipfile.ZipFile(zip_source) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not info.filename.endswith(".xml"):
+                continue
+            with zf.open(info) as fp:
+                filing, sched_m = parse_both(fp, _object_id(info.filename))
+            if filing is None:
+                logger.debug("Skipping unparseable zip member: %s", info.filename)
+                continue
+            yield filing, sched_m
+
+
+def _object_id(filename: str) -> str:
+    """Return the object_id an e-file XML is named after."""
+    oid = PurePosixPath(filename).stem  # e.g., "201541349349307794"
+    # Remove trailing _public if present
+    return oid.removesuffix("_public")
+
+
+# ── Batch parser (multiprocessing) ────────────────────────────────────────
+
+
+# Output buffer per JSONL file: records are small, so a large buffer turns
+# millions of line writes into a few thousand write syscalls.
+_WRITE_BUFFER = 4 * 1024 * 1024
+
+
+def _to_jsonl(record: dict) -> bytes:
+    return orjson.dumps(record, default=str) + b"\n"
+
+
+def _parse_one(args: tuple[Path, str]) -> tuple[bytes | None, bytes | None]:
+    """Worker function for multiprocessing: parse one XML into filing + schedule_m.
+
+    Records are returned already encoded as JSONL lines, so the main process
+    only writes bytes instead of unpickling dicts and re-serialising them.
+    A filing without a numeric EIN yields neither record.
+    """
+    filing, sched_m = parse_both(*args)
+    if filing and not filing.get("ein"):
+        # ein is REQUIRED in BigQuery: a filing without a usable one is skipped
+        logger.debug("Skipping %s: no numeric EIN", args[0])
+        return None, None
+    return (
+        _to_jsonl(filing) if filing else None,
+        _to_jsonl(sched_m) if sched_m else None,
+    )
+
+
+def _parse_filing_job(job: tuple[Path, str]) -> dict | None:
+    return parse_filing(*job)
+
+
+def _job_size(job: tuple[Path, str]) -> int:
+    try:
+        return job[0].stat().st_size
+    except OSError:
+        return 0
+
+
+def parse_filings(
+    jobs: Iterable[tuple[Path, str]],
+    workers: int | None = None,
+) -> Iterator[dict]:
+    """Run ``parse_filing`` over ``(xml_path, object_id)`` jobs in a process pool.
+
+    Yields each parsed filing; files that fail to parse are skipped.  Jobs
+    are submitted largest file first so a few big returns don't straggle at
+    the end, which means results come back in that order, not input order.
+    """
+    ordered = sorted(jobs, key=_job_size, reverse=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for filing in pool.map(_parse_filing_job, ordered, chunksize=32):
+            if filing is not None:
+                yield filing
+
+
+def _parsed_object_ids(path: Path) -> set[str]:
+    """Return the object_ids already written to a parsed JSONL file."""
+    done: set[str] = set()
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                done.add(orjson.loads(line)["object_id"])
+    return done
+
+
+# Layout version of the filing / Schedule M records.  Bump it whenever the
+# records gain or change columns: JSONL written under another version is
+# then re-parsed in full instead of being appended to.
+#   2: filings carry the Schedule M columns
+RECORD_VERSION = 2
+
+
+def _state_path() -> Path:
+    return PARSED_DIR / "parse_state.json"
+
+
+def _stored_record_version() -> int | None:
+    """Return the record version the parsed JSONL was written with (None if unknown)."""
+    try:
+        return orjson.loads(_state_path().read_bytes())["record_version"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def needs_full_reparse() -> bool:
+    """True if parsed JSONL exists but holds records of an older layout."""
+    return (
+        (PARSED_DIR / "filings.jsonl").exists()
+        and _stored_record_version() != RECORD_VERSION
+    )
+
+
+def _delta_path(path: Path) -> Path:
+    """Return the ``*_delta.jsonl`` file that collects records not yet loaded."""
+    return path.with_name(f"{path.stem}_delta{path.suffix}")
+
+
+def _append_file(src: Path, dest: Path) -> None:
+    with open(src, "rb") as fsrc, open(dest, "ab") as fdst:
+        shutil.copyfileobj(fsrc, fdst, length=_WRITE_BUFFER)
+
+
 def parse_all_xmls(
     force: bool = False,
     num_workers: int | None = None,
 ) -> tuple[Path, Path]:
-    """Parse all downloaded XMLs and write filings.jsonl + schedule_m.jsonl.
+    """Parse downloaded XMLs and write filings.jsonl + schedule_m.jsonl.
+
+    Unless *force* is set, XMLs whose object_id is already in an existing
+    ``filings.jsonl`` are skipped and only new filings are parsed and
+    appended.  Files written under another ``RECORD_VERSION`` are not
+    appended to: every XML is re-parsed (see ``needs_full_reparse``).  New
+    records are written to ``.part`` files first, so an interrupted run
+    leaves the existing outputs untouched; an incremental run also appends
+    them to ``filings_delta.jsonl`` / ``schedule_m_delta.jsonl`` for
+    ``load_bigquery.merge_filings``.
 
     Returns (filings_path, schedule_m_path).
     """
     filings_path = PARSED_DIR / "filings.jsonl"
     sched_m_path = PARSED_DIR / "schedule_m.jsonl"
 
-    if filings_path.exists() and sched_m_path.exists() and not force:
-        logger.info("Parsed files already exist. Use force=True to re-parse.")
-        return filings_path, sched_m_path
-
     # Gather XML files
     xml_files = sorted(XML_DIR.glob("*.xml"))
     if not xml_files:
         logger.warning("No XML files found in %s", XML_DIR)
         return filings_path, sched_m_path
 
-    logger.info("Parsing %d XML files ...", len(xml_files))
+    incremental = not force and filings_path.exists() and sched_m_path.exists()
+    if incremental and needs_full_reparse():
+        logger.warning(
+            "Parsed files have record version %s, not %d: re-parsing every XML.",
+            _stored_record_version(), RECORD_VERSION,
+        )
+        incremental = False
+    done = _parsed_object_ids(filings_path) if incremental else set()
 
     # Build work items: (path, object_id)
     work = []
     for p in xml_files:
-        oid = p.stem  # e.g., "201541349349307794"
-        # Remove trailing _public if present
-        if oid.endswith("_public"):
-            oid = oid[:-7]
-        work.append((p, oid))
+        oid = _object_id(p.name)
+        if oid not in done:
+            work.append((p, oid))
+
+    if not work:
+        logger.info("All %d XML files already parsed. Use force=True to re-parse.", len(xml_files))
+        return filings_path, sched_m_path
+
+    logger.info("Parsing %d XML files (%d already parsed) ...", len(work), len(done))
 
     if num_workers is None:
-        num_workers = max(1, mp.cpu_count() - 1)
+        num_workers = max(1, (os.cpu_count() or 2) - 1)
 
     filing_count = 0
     sched_m_count = 0
+    filings_tmp = filings_path.with_suffix(".jsonl.part")
+    sched_m_tmp = sched_m_path.with_suffix(".jsonl.part")
 
     with (
-        open(filings_path, "w", encoding="utf-8") as f_filings,
-        open(sched_m_path, "w", encoding="utf-8") as f_sched,
+        open(filings_tmp, "wb", buffering=_WRITE_BUFFER) as f_filings,
+        open(sched_m_tmp, "wb", buffering=_WRITE_BUFFER) as f_sched,
     ):
         # Use multiprocessing for CPU-bound XML parsing
-        with mp.Pool(processes=num_workers) as pool:
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
             from tqdm import tqdm
             for filing, sched_m in tqdm(
-                pool.imap_unordered(_parse_one, work, chunksize=100),
+                pool.map(_parse_one, work, chunksize=64),
                 total=len(work),
                 desc="Parsing XMLs",
             ):
                 if filing:
-                    f_filings.write(json.dumps(filing, ensure_ascii=False, default=str) + "\n")
+                    f_filings.write(filing)
                     filing_count += 1
                 if sched_m:
-                    f_sched.write(json.dumps(sched_m, ensure_ascii=False, default=str) + "\n")
+                    f_sched.write(sched_m)
                     sched_m_count += 1
 
+    # New records are also collected in *_delta.jsonl until they are merged
+    # into BigQuery (see load_bigquery.merge_filings); a full re-parse makes
+    # any pending delta moot.  filings.jsonl records what has been parsed,
+    # so it is appended to last: a run interrupted before then re-parses
+    # the same XMLs, and the merge skips rows that are already present.
+    outputs = ((sched_m_tmp, sched_m_path), (filings_tmp, filings_path))
+    if incremental:
+        for tmp, dest in outputs:
+            _append_file(tmp, _delta_path(dest))
+        for tmp, dest in outputs:
+            _append_file(tmp, dest)
+            tmp.unlink()
+    else:
+        for tmp, dest in outputs:
+            tmp.replace(dest)
+            _delta_path(dest).unlink(missing_ok=True)
+    if not incremental:
+        _state_path().write_bytes(orjson.dumps({"record_version": RECORD_VERSION}))
+
     logger.info(
-        "Parsing complete: %d filings, %d with Schedule M",
+        "Parsing complete: %d new filings, %d with Schedule M",
         filing_count, sched_m_count,
     )
     return filings_path, sched_m_path
@@ -1,83 +1,108 @@
 #!/usr/bin/env python3
-"""Create or replace the BigQuery prospecting view.
+"""Create or replace the BigQuery prospecting table and view.
 
-The ``vw_inkind_prospecting`` view joins the organisations, filings, and
-schedule_m tables into a single flat table designed for non-technical staff
-to explore organisations that accept in-kind donations.
+The ``tbl_inkind_prospecting`` table joins the organisations and filings
+tables into a single flat table designed for non-technical staff to explore
+organisations that accept in-kind donations.  Schedule M columns are read
+from the filing row, where they are denormalised at parse time.  The table
+is rebuilt after each load, so dashboard queries read pre-joined rows
+instead of re-running the join and latest-filing window on every access.
+
+``vw_inkind_prospecting`` is a thin view over that table, kept so existing
+dashboards and saved queries continue to work unchanged.
 """
 
 from __future__ import annotations
 
+import functools
 import logging
+import string
+from dataclasses import dataclass
 
 from google.cloud import bigquery
 
+from pipeline.bq import bq_client
 from pipeline.config import (
     BQ_DATASET,
     BQ_TABLE_FILINGS,
+    BQ_TABLE_NTEE_MAJOR_GROUP,
     BQ_TABLE_ORGANIZATIONS,
-    BQ_TABLE_SCHEDULE_M,
+    BQ_TABLE_PROSPECTING,
     BQ_VIEW_PROSPECTING,
     GCP_PROJECT_ID,
+    SCHEDULE_M_ACCEPTS_ALIASES,
     SCHEDULE_M_PROPERTY_TYPES,
 )
 
 logger = logging.getLogger(__name__)
 
+# Only filings from the newest tax year on record and the previous
+# _LATEST_FILING_YEARS years are considered for an EIN's "latest" filing;
+# older partitions are pruned instead of scanned.  This narrows the output:
+# an organisation with no filing in that window (or only filings without a
+# tax_year) keeps its row, with NULL filing and Schedule M columns.
+_LATEST_FILING_YEARS = 4
 
-def _property_type_cols() -> str:
-    """Generate SQL column references for all Schedule M property types."""
-    lines: list[str] = []
-    for _line, prefix, _desc in SCHEDULE_M_PROPERTY_TYPES:
-        lines.append(f"    m.{prefix}_x")
-        lines.append(f"    m.{prefix}_count")
-        lines.append(f"    m.{prefix}_amount")
-        lines.append(f"    m.{prefix}_method")
-        if prefix.startswith("other_"):
-            lines.append(f"    m.{prefix}_desc")
-    return ",\n".join(lines)
 
+# ── Schedule M SQL fragments (built once at import) ─────────────────────
 
-def _noncash_amount_sum() -> str:
-    """Generate a COALESCE+sum expression for total noncash amounts."""
-    parts = []
-    for _line, prefix, _desc in SCHEDULE_M_PROPERTY_TYPES:
-        parts.append(f"COALESCE(m.{prefix}_amount, 0)")
-    return " + ".join(parts)
 
+@dataclass(frozen=True)
+class _ScheduleMSql:
+    """SQL fragments generated from ``SCHEDULE_M_PROPERTY_TYPES``."""
 
-def _noncash_category_count() -> str:
-    """Generate expression counting how many property types have a check."""
-    parts = []
-    for _line, prefix, _desc in SCHEDULE_M_PROPERTY_TYPES:
-        parts.append(f"CASE WHEN m.{prefix}_x IS TRUE THEN 1 ELSE 0 END")
-    return " + ".join(parts)
+    property_cols: str   # column references for all property types
+    noncash_sum: str     # subquery summing all property-type amounts
+    noncash_count: str   # subquery counting property types with a check
+    accepts_cols: str    # accepts_* convenience columns
+    accepts_bitmask: str  # bit i set when property type i is checked
 
 
-def build_view_sql() -> str:
-    """Return the CREATE OR REPLACE VIEW SQL statement."""
-    dataset = f"`{GCP_PROJECT_ID}.{BQ_DATASET}`"
-    orgs = f"{dataset}.{BQ_TABLE_ORGANIZATIONS}"
-    filings = f"{dataset}.{BQ_TABLE_FILINGS}"
-    sched_m = f"{dataset}.{BQ_TABLE_SCHEDULE_M}"
+def _build_schedule_m_sql() -> _ScheduleMSql:
+    """Generate every Schedule M fragment in one pass over the property types."""
+    cols: list[str] = []
+    sums: list[str] = []
+    counts: list[str] = []
+    accepts: list[str] = []
+    bits: list[str] = []
+    width = max(len(f"COALESCE(lf.{p}_x, FALSE)") for p in SCHEDULE_M_ACCEPTS_ALIASES)
+    for bit, (_line, prefix, _desc) in enumerate(SCHEDULE_M_PROPERTY_TYPES):
+        cols.append(f"    lf.{prefix}_x")
+        cols.append(f"    lf.{prefix}_count")
+        cols.append(f"    lf.{prefix}_amount")
+        cols.append(f"    lf.{prefix}_method")
+        if prefix.startswith("other_"):
+            cols.append(f"    lf.{prefix}_desc")
+        sums.append(f"IFNULL(lf.{prefix}_amount, 0)")
+        counts.append(f"lf.{prefix}_x")
+        bits.append(f"IF(lf.{prefix}_x, {1 << bit}, 0)")
+    for prefix, alias in SCHEDULE_M_ACCEPTS_ALIASES.items():
+        expr = f"COALESCE(lf.{prefix}_x, FALSE)"
+        accepts.append(f"    {expr:<{width}} AS {alias}")
+    return _ScheduleMSql(
+        property_cols=",\n".join(cols),
+        # Reduce over an inline array instead of a 28-term + chain.
+        noncash_sum=f"SELECT SUM(v) FROM UNNEST([{', '.join(sums)}]) AS v",
+        noncash_count=f"SELECT COUNTIF(v) FROM UNNEST([{', '.join(counts)}]) AS v",
+        accepts_cols=",\n".join(accepts),
+        accepts_bitmask=" | ".join(bits),
+    )
+
+
+_SCHED_M_SQL = _build_schedule_m_sql()
 
-    property_cols = _property_type_cols()
-    noncash_sum = _noncash_amount_sum()
-    noncash_count = _noncash_category_count()
 
-    sql = f"""CREATE OR REPLACE VIEW {dataset}.{BQ_VIEW_PROSPECTING} AS
-WITH latest_filing AS (
+# ── SQL templates ────────────────────────────────────────────────────────
+# Plain SQL with ``$name`` slots, so the statements read (and diff) as SQL.
+
+_SELECT_TEMPLATE = string.Template("""WITH latest_filing AS (
     -- Pick the most recent filing per EIN
-    SELECT *
-    FROM (
-        SELECT
-            f.*,
-            ROW_NUMBER() OVER (
-                PARTITION BY f.ein ORDER BY f.tax_year DESC, f.object_id DESC
-            ) AS _rn
-        FROM {filings} AS f
-    )
-    WHERE _rn = 1
+    SELECT f.*
+    FROM $filings AS f
+    WHERE f.tax_year >= $cutoff
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY f.ein ORDER BY f.tax_year DESC, f.object_id DESC
+    ) = 1
 )
 SELECT
     -- Organisation identity
@@ -89,35 +114,7 @@ SELECT
     o.state,
     o.zip,
     o.ntee_code,
-    CASE SUBSTR(o.ntee_code, 1, 1)
-        WHEN 'A' THEN 'Arts, Culture & Humanities'
-        WHEN 'B' THEN 'Education'
-        WHEN 'C' THEN 'Environment and Animals'
-        WHEN 'D' THEN 'Animal-Related'
-        WHEN 'E' THEN 'Health'
-        WHEN 'F' THEN 'Mental Health & Crisis'
-        WHEN 'G' THEN 'Diseases, Disorders & Medical'
-        WHEN 'H' THEN 'Medical Research'
-        WHEN 'I' THEN 'Crime & Legal-Related'
-        WHEN 'J' THEN 'Employment & Job-Related'
-        WHEN 'K' THEN 'Food, Agriculture & Nutrition'
-        WHEN 'L' THEN 'Housing & Shelter'
-        WHEN 'M' THEN 'Public Safety & Disaster'
-        WHEN 'N' THEN 'Recreation & Sports'
-        WHEN 'O' THEN 'Youth Development'
-        WHEN 'P' THEN 'Human Services'
-        WHEN 'Q' THEN 'International'
-        WHEN 'R' THEN 'Civil Rights & Advocacy'
-        WHEN 'S' THEN 'Community Improvement'
-        WHEN 'T' THEN 'Philanthropy & Voluntarism'
-        WHEN 'U' THEN 'Science & Technology'
-        WHEN 'V' THEN 'Social Science'
-        WHEN 'W' THEN 'Public & Societal Benefit'
-        WHEN 'X' THEN 'Religion Related'
-        WHEN 'Y' THEN 'Mutual & Membership Benefit'
-        WHEN 'Z' THEN 'Unknown / Unclassified'
-        ELSE 'Unknown / Unclassified'
-    END                             AS ntee_major_group,
+    COALESCE(n.label, 'Unknown / Unclassified') AS ntee_major_group,
     o.foundation_code,
     o.ruling_date,
     o.asset_code,
@@ -154,41 +151,147 @@ SELECT
     lf.has_schedule_m,
 
     -- Schedule M: all property-type columns
-{property_cols},
-    m.num_forms_8283,
-    m.gift_acceptance_policy,
-    m.uses_third_parties,
+$property_cols,
+    lf.num_forms_8283,
+    lf.gift_acceptance_policy,
+    lf.uses_third_parties,
 
     -- Computed convenience columns
-    COALESCE(m.food_inventory_x, FALSE)             AS accepts_food,
-    COALESCE(m.clothing_household_x, FALSE)         AS accepts_clothing,
-    COALESCE(m.cars_vehicles_x, FALSE)              AS accepts_vehicles,
-    COALESCE(m.books_publications_x, FALSE)         AS accepts_books,
-    COALESCE(m.drugs_medical_x, FALSE)              AS accepts_drugs_medical,
-    COALESCE(m.securities_publicly_traded_x, FALSE) AS accepts_securities,
-    ({noncash_sum})                                 AS total_noncash_amount,
-    ({noncash_count})                               AS noncash_category_count
-
-FROM {orgs} AS o
+$accepts_cols,
+    ($accepts_bitmask)                             AS accepts_bitmask,
+    ($noncash_sum)                                 AS total_noncash_amount,
+    ($noncash_count)                               AS noncash_category_count
+
+-- Largest table first, then decreasing size.
+FROM $orgs AS o
 LEFT JOIN latest_filing AS lf ON o.ein = lf.ein
-LEFT JOIN {sched_m} AS m ON lf.object_id = m.object_id
-"""
-    return sql
+LEFT JOIN $ntee_dim AS n ON SUBSTR(o.ntee_code, 1, 1) = n.code
+""")
+
+_TABLE_TEMPLATE = string.Template("""DECLARE max_year INT64 DEFAULT (
+    SELECT MAX(SAFE_CAST(partition_id AS INT64))
+    FROM $dataset.INFORMATION_SCHEMA.PARTITIONS
+    WHERE table_name = '$filings_table'
+);
+DECLARE cutoff INT64;
+
+IF max_year IS NULL THEN
+    -- filings is not partitioned by tax_year (yet): read the maximum directly
+    SET max_year = (SELECT MAX(tax_year) FROM $filings);
+END IF;
+SET cutoff = max_year - $latest_years;
+
+CREATE OR REPLACE TABLE $table
+PARTITION BY RANGE_BUCKET(asset_code, GENERATE_ARRAY(0, 10, 1))
+CLUSTER BY ntee_code, state
+AS
+$select""")
+
+_VIEW_TEMPLATE = string.Template("""CREATE OR REPLACE VIEW $view AS
+SELECT * FROM $table
+""")
+
+
+def _dataset() -> str:
+    return f"`{GCP_PROJECT_ID}.{BQ_DATASET}`"
+
+
+def _prospecting_select_sql(cutoff: str = "cutoff") -> str:
+    """Return the SELECT that flattens the source tables into prospecting rows.
+
+    *cutoff* is the SQL expression bounding ``tax_year`` in latest_filing:
+    the script variable by default, or a query parameter for a dry run.
+    """
+    dataset = _dataset()
+    return _SELECT_TEMPLATE.substitute(
+        orgs=f"{dataset}.{BQ_TABLE_ORGANIZATIONS}",
+        filings=f"{dataset}.{BQ_TABLE_FILINGS}",
+        ntee_dim=f"{dataset}.{BQ_TABLE_NTEE_MAJOR_GROUP}",
+        cutoff=cutoff,
+        property_cols=_SCHED_M_SQL.property_cols,
+        accepts_cols=_SCHED_M_SQL.accepts_cols,
+        accepts_bitmask=_SCHED_M_SQL.accepts_bitmask,
+        noncash_sum=_SCHED_M_SQL.noncash_sum,
+        noncash_count=_SCHED_M_SQL.noncash_count,
+    )
+
+
+@functools.cache
+def build_table_sql() -> str:
+    """Return the CREATE OR REPLACE TABLE SQL for the prospecting table.
+
+    Partitioned by asset code (0-9) and clustered by NTEE code then state,
+    the filters staff use most, so typical dashboard queries prune blocks.
+
+    The statement is a script: it first reads the newest ``tax_year``
+    partition of ``filings`` from ``INFORMATION_SCHEMA.PARTITIONS`` (a
+    metadata lookup, no table scan) into ``max_year``, falling back to
+    ``MAX(tax_year)`` for an unpartitioned table.  The latest-filing filter
+    then compares against the script variable ``cutoff`` — a constant at
+    plan time that BigQuery can prune partitions with, unlike an inline
+    ``(SELECT MAX(tax_year) ...)`` subquery.  Organisations with no filing
+    in that window get NULL filing columns (see ``_LATEST_FILING_YEARS``).
+    """
+    dataset = _dataset()
+    return _TABLE_TEMPLATE.substitute(
+        dataset=dataset,
+        filings_table=BQ_TABLE_FILINGS,
+        filings=f"{dataset}.{BQ_TABLE_FILINGS}",
+        latest_years=_LATEST_FILING_YEARS,
+        table=f"{dataset}.{BQ_TABLE_PROSPECTING}",
+        select=_prospecting_select_sql(),
+    )
+
+
+@functools.cache
+def build_view_sql() -> str:
+    """Return the CREATE OR REPLACE VIEW SQL statement."""
+    dataset = _dataset()
+    return _VIEW_TEMPLATE.substitute(
+        view=f"{dataset}.{BQ_VIEW_PROSPECTING}",
+        table=f"{dataset}.{BQ_TABLE_PROSPECTING}",
+    )
+
+
+def validate_prospecting_sql(client: bigquery.Client) -> None:
+    """Dry-run the prospecting SELECT so SQL errors surface before any DDL.
+
+    A dry run is validated and planned but not executed or billed.  The
+    script variable ``cutoff`` is stood in for by a query parameter, since
+    only the single-statement SELECT is dry-run.
+    """
+    job_config = bigquery.QueryJobConfig(
+        dry_run=True,
+        use_query_cache=False,
+        query_parameters=[bigquery.ScalarQueryParameter("cutoff", "INT64", 0)],
+    )
+    job = client.query(_prospecting_select_sql("@cutoff"), job_config=job_config)
+    logger.info(
+        "Prospecting SQL is valid (full scan would read %.1f MB).",
+        (job.total_bytes_processed or 0) / 1e6,
+    )
 
 
 def create_prospecting_view() -> None:
-    """Execute CREATE OR REPLACE VIEW for the prospecting view."""
-    client = bigquery.Client(project=GCP_PROJECT_ID)
-    sql = build_view_sql()
-    logger.info("Creating view %s.%s ...", BQ_DATASET, BQ_VIEW_PROSPECTING)
-    query_job = client.query(sql)
-    query_job.result()
+    """Rebuild the prospecting table, then point the view at it.
+
+    The SQL is dry-run first; the table build and the view DDL are then
+    submitted as one script job.
+    """
+    client = bq_client()
+    validate_prospecting_sql(client)
+    logger.info(
+        "Building table %s.%s and view %s ...",
+        BQ_DATASET, BQ_TABLE_PROSPECTING, BQ_VIEW_PROSPECTING,
+    )
+    client.query(f"{build_table_sql()};\n\n{build_view_sql()}").result()
     logger.info("View %s created successfully.", BQ_VIEW_PROSPECTING)
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
     # Print the SQL for review
+    print(build_table_sql())
     print(build_view_sql())
     print("\n--- Executing ---")
     create_prospecting_view()
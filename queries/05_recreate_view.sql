@@ -1,16 +1,42 @@
-CREATE OR REPLACE VIEW `irs-dataset-487317.irs_501c3_data_bq`.vw_inkind_prospecting AS
+-- ============================================================================
+-- 05 RECREATE VIEW — Rebuild tbl_inkind_prospecting and vw_inkind_prospecting
+--
+-- Generated from pipeline/views.py (build_table_sql + build_view_sql); do not
+-- edit by hand.  Prefer running the pipeline step, which also dry-runs the
+-- SQL first:
+--
+--     python -m pipeline.views
+--
+-- Regenerate this file after changing views.py.  The script needs the NTEE
+-- dimension table created by setup_bigquery.py, and filings loaded
+-- with the Schedule M columns.
+-- ============================================================================
+
+DECLARE max_year INT64 DEFAULT (
+    SELECT MAX(SAFE_CAST(partition_id AS INT64))
+    FROM `irs-dataset-487317.irs_501c3_data_bq`.INFORMATION_SCHEMA.PARTITIONS
+    WHERE table_name = 'filings'
+);
+DECLARE cutoff INT64;
+
+IF max_year IS NULL THEN
+    -- filings is not partitioned by tax_year (yet): read the maximum directly
+    SET max_year = (SELECT MAX(tax_year) FROM `irs-dataset-487317.irs_501c3_data_bq`.filings);
+END IF;
+SET cutoff = max_year - 4;
+
+CREATE OR REPLACE TABLE `irs-dataset-487317.irs_501c3_data_bq`.tbl_inkind_prospecting
+PARTITION BY RANGE_BUCKET(asset_code, GENERATE_ARRAY(0, 10, 1))
+CLUSTER BY ntee_code, state
+AS
 WITH latest_filing AS (
     -- Pick the most recent filing per EIN
-    SELECT *
-    FROM (
-        SELECT
-            f.*,
-            ROW_NUMBER() OVER (
-                PARTITION BY f.ein ORDER BY f.tax_year DESC, f.object_id DESC
-            ) AS _rn
-        FROM `irs-dataset-487317.irs_501c3_data_bq`.filings AS f
-    )
-    WHERE _rn = 1
+    SELECT f.*
+    FROM `irs-dataset-487317.irs_501c3_data_bq`.filings AS f
+    WHERE f.tax_year >= cutoff
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY f.ein ORDER BY f.tax_year DESC, f.object_id DESC
+    ) = 1
 )
 SELECT
     -- Organisation identity
@@ -22,35 +48,7 @@ SELECT
     o.state,
     o.zip,
     o.ntee_code,
-    CASE SUBSTR(o.ntee_code, 1, 1)
-        WHEN 'A' THEN 'Arts, Culture & Humanities'
-        WHEN 'B' THEN 'Education'
-        WHEN 'C' THEN 'Environment and Animals'
-        WHEN 'D' THEN 'Animal-Related'
-        WHEN 'E' THEN 'Health'
-        WHEN 'F' THEN 'Mental Health & Crisis'
-        WHEN 'G' THEN 'Diseases, Disorders & Medical'
-        WHEN 'H' THEN 'Medical Research'
-        WHEN 'I' THEN 'Crime & Legal-Related'
-        WHEN 'J' THEN 'Employment & Job-Related'
-        WHEN 'K' THEN 'Food, Agriculture & Nutrition'
-        WHEN 'L' THEN 'Housing & Shelter'
-        WHEN 'M' THEN 'Public Safety & Disaster'
-        WHEN 'N' THEN 'Recreation & Sports'
-        WHEN 'O' THEN 'Youth Development'
-        WHEN 'P' THEN 'Human Services'
-        WHEN 'Q' THEN 'International'
-        WHEN 'R' THEN 'Civil Rights & Advocacy'
-        WHEN 'S' THEN 'Community Improvement'
-        WHEN 'T' THEN 'Philanthropy & Voluntarism'
-        WHEN 'U' THEN 'Science & Technology'
-        WHEN 'V' THEN 'Social Science'
-        WHEN 'W' THEN 'Public & Societal Benefit'
-        WHEN 'X' THEN 'Religion Related'
-        WHEN 'Y' THEN 'Mutual & Membership Benefit'
-        WHEN 'Z' THEN 'Unknown / Unclassified'
-        ELSE 'Unknown / Unclassified'
-    END                             AS ntee_major_group,
+    COALESCE(n.label, 'Unknown / Unclassified') AS ntee_major_group,
     o.foundation_code,
     o.ruling_date,
     o.asset_code,
@@ -87,137 +85,142 @@ SELECT
     lf.has_schedule_m,
 
     -- Schedule M: all property-type columns
-    m.art_works_x,
-    m.art_works_count,
-    m.art_works_amount,
-    m.art_works_method,
-    m.art_historical_x,
-    m.art_historical_count,
-    m.art_historical_amount,
-    m.art_historical_method,
-    m.art_fractional_x,
-    m.art_fractional_count,
-    m.art_fractional_amount,
-    m.art_fractional_method,
-    m.books_publications_x,
-    m.books_publications_count,
-    m.books_publications_amount,
-    m.books_publications_method,
-    m.clothing_household_x,
-    m.clothing_household_count,
-    m.clothing_household_amount,
-    m.clothing_household_method,
-    m.cars_vehicles_x,
-    m.cars_vehicles_count,
-    m.cars_vehicles_amount,
-    m.cars_vehicles_method,
-    m.boats_planes_x,
-    m.boats_planes_count,
-    m.boats_planes_amount,
-    m.boats_planes_method,
-    m.intellectual_property_x,
-    m.intellectual_property_count,
-    m.intellectual_property_amount,
-    m.intellectual_property_method,
-    m.securities_publicly_traded_x,
-    m.securities_publicly_traded_count,
-    m.securities_publicly_traded_amount,
-    m.securities_publicly_traded_method,
-    m.securities_closely_held_x,
-    m.securities_closely_held_count,
-    m.securities_closely_held_amount,
-    m.securities_closely_held_method,
-    m.securities_partnership_x,
-    m.securities_partnership_count,
-    m.securities_partnership_amount,
-    m.securities_partnership_method,
-    m.securities_misc_x,
-    m.securities_misc_count,
-    m.securities_misc_amount,
-    m.securities_misc_method,
-    m.conservation_historic_x,
-    m.conservation_historic_count,
-    m.conservation_historic_amount,
-    m.conservation_historic_method,
-    m.conservation_other_x,
-    m.conservation_other_count,
-    m.conservation_other_amount,
-    m.conservation_other_method,
-    m.real_estate_residential_x,
-    m.real_estate_residential_count,
-    m.real_estate_residential_amount,
-    m.real_estate_residential_method,
-    m.real_estate_commercial_x,
-    m.real_estate_commercial_count,
-    m.real_estate_commercial_amount,
-    m.real_estate_commercial_method,
-    m.real_estate_other_x,
-    m.real_estate_other_count,
-    m.real_estate_other_amount,
-    m.real_estate_other_method,
-    m.collectibles_x,
-    m.collectibles_count,
-    m.collectibles_amount,
-    m.collectibles_method,
-    m.food_inventory_x,
-    m.food_inventory_count,
-    m.food_inventory_amount,
-    m.food_inventory_method,
-    m.drugs_medical_x,
-    m.drugs_medical_count,
-    m.drugs_medical_amount,
-    m.drugs_medical_method,
-    m.taxidermy_x,
-    m.taxidermy_count,
-    m.taxidermy_amount,
-    m.taxidermy_method,
-    m.historical_artifacts_x,
-    m.historical_artifacts_count,
-    m.historical_artifacts_amount,
-    m.historical_artifacts_method,
-    m.scientific_specimens_x,
-    m.scientific_specimens_count,
-    m.scientific_specimens_amount,
-    m.scientific_specimens_method,
-    m.archaeological_artifacts_x,
-    m.archaeological_artifacts_count,
-    m.archaeological_artifacts_amount,
-    m.archaeological_artifacts_method,
-    m.other_1_x,
-    m.other_1_count,
-    m.other_1_amount,
-    m.other_1_method,
-    m.other_1_desc,
-    m.other_2_x,
-    m.other_2_count,
-    m.other_2_amount,
-    m.other_2_method,
-    m.other_2_desc,
-    m.other_3_x,
-    m.other_3_count,
-    m.other_3_amount,
-    m.other_3_method,
-    m.other_3_desc,
-    m.other_4_x,
-    m.other_4_count,
-    m.other_4_amount,
-    m.other_4_method,
-    m.other_4_desc,
-    m.num_forms_8283,
-    m.gift_acceptance_policy,
-    m.uses_third_parties,
+    lf.art_works_x,
+    lf.art_works_count,
+    lf.art_works_amount,
+    lf.art_works_method,
+    lf.art_historical_x,
+    lf.art_historical_count,
+    lf.art_historical_amount,
+    lf.art_historical_method,
+    lf.art_fractional_x,
+    lf.art_fractional_count,
+    lf.art_fractional_amount,
+    lf.art_fractional_method,
+    lf.books_publications_x,
+    lf.books_publications_count,
+    lf.books_publications_amount,
+    lf.books_publications_method,
+    lf.clothing_household_x,
+    lf.clothing_household_count,
+    lf.clothing_household_amount,
+    lf.clothing_household_method,
+    lf.cars_vehicles_x,
+    lf.cars_vehicles_count,
+    lf.cars_vehicles_amount,
+    lf.cars_vehicles_method,
+    lf.boats_planes_x,
+    lf.boats_planes_count,
+    lf.boats_planes_amount,
+    lf.boats_planes_method,
+    lf.intellectual_property_x,
+    lf.intellectual_property_count,
+    lf.intellectual_property_amount,
+    lf.intellectual_property_method,
+    lf.securities_publicly_traded_x,
+    lf.securities_publicly_traded_count,
+    lf.securities_publicly_traded_amount,
+    lf.securities_publicly_traded_method,
+    lf.securities_closely_held_x,
+    lf.securities_closely_held_count,
+    lf.securities_closely_held_amount,
+    lf.securities_closely_held_method,
+    lf.securities_partnership_x,
+    lf.securities_partnership_count,
+    lf.securities_partnership_amount,
+    lf.securities_partnership_method,
+    lf.securities_misc_x,
+    lf.securities_misc_count,
+    lf.securities_misc_amount,
+    lf.securities_misc_method,
+    lf.conservation_historic_x,
+    lf.conservation_historic_count,
+    lf.conservation_historic_amount,
+    lf.conservation_historic_method,
+    lf.conservation_other_x,
+    lf.conservation_other_count,
+    lf.conservation_other_amount,
+    lf.conservation_other_method,
+    lf.real_estate_residential_x,
+    lf.real_estate_residential_count,
+    lf.real_estate_residential_amount,
+    lf.real_estate_residential_method,
+    lf.real_estate_commercial_x,
+    lf.real_estate_commercial_count,
+    lf.real_estate_commercial_amount,
+    lf.real_estate_commercial_method,
+    lf.real_estate_other_x,
+    lf.real_estate_other_count,
+    lf.real_estate_other_amount,
+    lf.real_estate_other_method,
+    lf.collectibles_x,
+    lf.collectibles_count,
+    lf.collectibles_amount,
+    lf.collectibles_method,
+    lf.food_inventory_x,
+    lf.food_inventory_count,
+    lf.food_inventory_amount,
+    lf.food_inventory_method,
+    lf.drugs_medical_x,
+    lf.drugs_medical_count,
+    lf.drugs_medical_amount,
+    lf.drugs_medical_method,
+    lf.taxidermy_x,
+    lf.taxidermy_count,
+    lf.taxidermy_amount,
+    lf.taxidermy_method,
+    lf.historical_artifacts_x,
+    lf.historical_artifacts_count,
+    lf.historical_artifacts_amount,
+    lf.historical_artifacts_method,
+    lf.scientific_specimens_x,
+    lf.scientific_specimens_count,
+    lf.scientific_specimens_amount,
+    lf.scientific_specimens_method,
+    lf.archaeological_artifacts_x,
+    lf.archaeological_artifacts_count,
+    lf.archaeological_artifacts_amount,
+    lf.archaeological_artifacts_method,
+    lf.other_1_x,
+    lf.other_1_count,
+    lf.other_1_amount,
+    lf.other_1_method,
+    lf.other_1_desc,
+    lf.other_2_x,
+    lf.other_2_count,
+    lf.other_2_amount,
+    lf.other_2_method,
+    lf.other_2_desc,
+    lf.other_3_x,
+    lf.other_3_count,
+    lf.other_3_amount,
+    lf.other_3_method,
+    lf.other_3_desc,
+    lf.other_4_x,
+    lf.other_4_count,
+    lf.other_4_amount,
+    lf.other_4_method,
+    lf.other_4_desc,
+    lf.num_forms_8283,
+    lf.gift_acceptance_policy,
+    lf.uses_third_parties,
 
     -- Computed convenience columns
-    COALESCE(m.food_inventory_x, FALSE)             AS accepts_food,
-    COALESCE(m.clothing_household_x, FALSE)         AS accepts_clothing,
-    COALESCE(m.cars_vehicles_x, FALSE)              AS accepts_vehicles,
-    COALESCE(m.books_publications_x, FALSE)         AS accepts_books,
-    COALESCE(m.drugs_medical_x, FALSE)              AS accepts_drugs_medical,
-    COALESCE(m.securities_publicly_traded_x, FALSE) AS accepts_securities,
-    (COALESCE(m.art_works_amount, 0) + COALESCE(m.art_historical_amount, 0) + COALESCE(m.art_fractional_amount, 0) + COALESCE(m.books_publications_amount, 0) + COALESCE(m.clothing_household_amount, 0) + COALESCE(m.cars_vehicles_amount, 0) + COALESCE(m.boats_planes_amount, 0) + COALESCE(m.intellectual_property_amount, 0) + COALESCE(m.securities_publicly_traded_amount, 0) + COALESCE(m.securities_closely_held_amount, 0) + COALESCE(m.securities_partnership_amount, 0) + COALESCE(m.securities_misc_amount, 0) + COALESCE(m.conservation_historic_amount, 0) + COALESCE(m.conservation_other_amount, 0) + COALESCE(m.real_estate_residential_amount, 0) + COALESCE(m.real_estate_commercial_amount, 0) + COALESCE(m.real_estate_other_amount, 0) + COALESCE(m.collectibles_amount, 0) + COALESCE(m.food_inventory_amount, 0) + COALESCE(m.drugs_medical_amount, 0) + COALESCE(m.taxidermy_amount, 0) + COALESCE(m.historical_artifacts_amount, 0) + COALESCE(m.scientific_specimens_amount, 0) + COALESCE(m.archaeological_artifacts_amount, 0) + COALESCE(m.other_1_amount, 0) + COALESCE(m.other_2_amount, 0) + COALESCE(m.other_3_amount, 0) + COALESCE(m.other_4_amount, 0))                                 AS total_noncash_amount,
-    (CASE WHEN m.art_works_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.art_historical_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.art_fractional_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.books_publications_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.clothing_household_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.cars_vehicles_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.boats_planes_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.intellectual_property_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.securities_publicly_traded_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.securities_closely_held_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.securities_partnership_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.securities_misc_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.conservation_historic_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.conservation_other_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.real_estate_residential_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.real_estate_commercial_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.real_estate_other_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.collectibles_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.food_inventory_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.drugs_medical_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.taxidermy_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.historical_artifacts_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.scientific_specimens_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.archaeological_artifacts_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.other_1_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.other_2_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.other_3_x IS TRUE THEN 1 ELSE 0 END + CASE WHEN m.other_4_x IS TRUE THEN 1 ELSE 0 END)                               AS noncash_category_count
+    COALESCE(lf.food_inventory_x, FALSE)             AS accepts_food,
+    COALESCE(lf.clothing_household_x, FALSE)         AS accepts_clothing,
+    COALESCE(lf.cars_vehicles_x, FALSE)              AS accepts_vehicles,
+    COALESCE(lf.books_publications_x, FALSE)         AS accepts_books,
+    COALESCE(lf.drugs_medical_x, FALSE)              AS accepts_drugs_medical,
+    COALESCE(lf.securities_publicly_traded_x, FALSE) AS accepts_securities,
+    (IF(lf.art_works_x, 1, 0) | IF(lf.art_historical_x, 2, 0) | IF(lf.art_fractional_x, 4, 0) | IF(lf.books_publications_x, 8, 0) | IF(lf.clothing_household_x, 16, 0) | IF(lf.cars_vehicles_x, 32, 0) | IF(lf.boats_planes_x, 64, 0) | IF(lf.intellectual_property_x, 128, 0) | IF(lf.securities_publicly_traded_x, 256, 0) | IF(lf.securities_closely_held_x, 512, 0) | IF(lf.securities_partnership_x, 1024, 0) | IF(lf.securities_misc_x, 2048, 0) | IF(lf.conservation_historic_x, 4096, 0) | IF(lf.conservation_other_x, 8192, 0) | IF(lf.real_estate_residential_x, 16384, 0) | IF(lf.real_estate_commercial_x, 32768, 0) | IF(lf.real_estate_other_x, 65536, 0) | IF(lf.collectibles_x, 131072, 0) | IF(lf.food_inventory_x, 262144, 0) | IF(lf.drugs_medical_x, 524288, 0) | IF(lf.taxidermy_x, 1048576, 0) | IF(lf.historical_artifacts_x, 2097152, 0) | IF(lf.scientific_specimens_x, 4194304, 0) | IF(lf.archaeological_artifacts_x, 8388608, 0) | IF(lf.other_1_x, 16777216, 0) | IF(lf.other_2_x, 33554432, 0) | IF(lf.other_3_x, 67108864, 0) | IF(lf.other_4_x, 134217728, 0))                             AS accepts_bitmask,
+    (SELECT SUM(v) FROM UNNEST([IFNULL(lf.art_works_amount, 0), IFNULL(lf.art_historical_amount, 0), IFNULL(lf.art_fractional_amount, 0), IFNULL(lf.books_publications_amount, 0), IFNULL(lf.clothing_household_amount, 0), IFNULL(lf.cars_vehicles_amount, 0), IFNULL(lf.boats_planes_amount, 0), IFNULL(lf.intellectual_property_amount, 0), IFNULL(lf.securities_publicly_traded_amount, 0), IFNULL(lf.securities_closely_held_amount, 0), IFNULL(lf.securities_partnership_amount, 0), IFNULL(lf.securities_misc_amount, 0), IFNULL(lf.conservation_historic_amount, 0), IFNULL(lf.conservation_other_amount, 0), IFNULL(lf.real_estate_residential_amount, 0), IFNULL(lf.real_estate_commercial_amount, 0), IFNULL(lf.real_estate_other_amount, 0), IFNULL(lf.collectibles_amount, 0), IFNULL(lf.food_inventory_amount, 0), IFNULL(lf.drugs_medical_amount, 0), IFNULL(lf.taxidermy_amount, 0), IFNULL(lf.historical_artifacts_amount, 0), IFNULL(lf.scientific_specimens_amount, 0), IFNULL(lf.archaeological_artifacts_amount, 0), IFNULL(lf.other_1_amount, 0), IFNULL(lf.other_2_amount, 0), IFNULL(lf.other_3_amount, 0), IFNULL(lf.other_4_amount, 0)]) AS v)                                 AS total_noncash_amount,
+    (SELECT COUNTIF(v) FROM UNNEST([lf.art_works_x, lf.art_historical_x, lf.art_fractional_x, lf.books_publications_x, lf.clothing_household_x, lf.cars_vehicles_x, lf.boats_planes_x, lf.intellectual_property_x, lf.securities_publicly_traded_x, lf.securities_closely_held_x, lf.securities_partnership_x, lf.securities_misc_x, lf.conservation_historic_x, lf.conservation_other_x, lf.real_estate_residential_x, lf.real_estate_commercial_x, lf.real_estate_other_x, lf.collectibles_x, lf.food_inventory_x, lf.drugs_medical_x, lf.taxidermy_x, lf.historical_artifacts_x, lf.scientific_specimens_x, lf.archaeological_artifacts_x, lf.other_1_x, lf.other_2_x, lf.other_3_x, lf.other_4_x]) AS v)                               AS noncash_category_count
 
+-- Largest table first, then decreasing size.
 FROM `irs-dataset-487317.irs_501c3_data_bq`.organizations AS o
 LEFT JOIN latest_filing AS lf ON o.ein = lf.ein
-LEFT JOIN `irs-dataset-487317.irs_501c3_data_bq`.schedule_m AS m ON lf.object_id = m.object_id
+LEFT JOIN `irs-dataset-487317.irs_501c3_data_bq`.dim_ntee_major_group AS n ON SUBSTR(o.ntee_code, 1, 1) = n.code
+;
 
+CREATE OR REPLACE VIEW `irs-dataset-487317.irs_501c3_data_bq`.vw_inkind_prospecting AS
+SELECT * FROM `irs-dataset-487317.irs_501c3_data_bq`.tbl_inkind_prospecting
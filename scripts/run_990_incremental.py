@@ -3,9 +3,16 @@
 
 This script:
   1. Re-downloads the index files (they grow as the IRS adds new filings)
-  2. Downloads only NEW XML files (checkpoint-aware)
-  3. Re-parses all XMLs (or only new ones if you pass --parse-new-only)
-  4. Reloads the filings + schedule_m tables in BigQuery
+  2. Downloads only NEW XML files (skips ones already extracted)
+  3. Parses only XMLs not already in filings.jsonl
+  4. Merges the newly parsed filings + schedule_m rows into BigQuery
+
+Step 4 only inserts rows whose object_id is not in BigQuery yet, so the
+tables must already have been loaded once by ``run_full_pipeline``.  If the
+parsed files predate the current record layout (``RECORD_VERSION``), every
+XML is re-parsed in step 3 and step 4 reloads both tables in full instead.
+Re-run ``python setup_bigquery.py`` first after such an upgrade, so the
+tables have the new columns; the load stops with an error otherwise.
 
 Usage:
     python -m scripts.run_990_incremental [--skip-bigquery] [--xml-limit N]
@@ -41,23 +48,34 @@ def main() -> None:
     from pipeline.download_index import build_filtered_index
     build_filtered_index(force=True)
 
-    # Step 2: Download new XMLs only (checkpoint-aware)
+    # Step 2: Download new XMLs only (skips ones already extracted)
     logger.info("═══ Step 2/4: Download new XML files ═══")
     from pipeline.download_xml import run as download_xmls
     new_count = download_xmls(force=False, limit=args.xml_limit)
     logger.info("Downloaded %d new XML files.", new_count)
 
-    # Step 3: Re-parse all XMLs (idempotent)
+    # Step 3: Parse new XMLs only (appends to the existing JSONL files),
+    # or everything when the existing records have an older layout
     logger.info("═══ Step 3/4: Parse XML files ═══")
-    from pipeline.parse_990 import parse_all_xmls
-    parse_all_xmls(force=True)
+    from pipeline.parse_990 import needs_full_reparse, parse_all_xmls
+    full_reparse = needs_full_reparse()
+    if full_reparse:
+        logger.warning("Parsed records predate the current layout; re-parsing all XMLs.")
+    parse_all_xmls(force=full_reparse)
 
     if not args.skip_bigquery:
-        # Step 4: Reload filings + schedule_m (and refresh view)
-        logger.info("═══ Step 4/4: Load into BigQuery ═══")
-        from pipeline.load_bigquery import load_filings, load_schedule_m
-        load_filings()
-        load_schedule_m()
+        if full_reparse:
+            # Step 4: Existing rows changed too, so reload both tables
+            logger.info("═══ Step 4/4: Reload filings + schedule_m into BigQuery ═══")
+            from pipeline.load_bigquery import load_filings, load_schedule_m
+            load_filings()
+            load_schedule_m()
+        else:
+            # Step 4: Merge new filings + schedule_m rows (and refresh view)
+            logger.info("═══ Step 4/4: Merge new rows into BigQuery ═══")
+            from pipeline.load_bigquery import merge_filings, merge_schedule_m
+            merge_filings()
+            merge_schedule_m()
 
         from pipeline.views import create_prospecting_view
         create_prospecting_view()
@@ -6,7 +6,7 @@ filters for 501(c)(3) organisations, and reloads the BigQuery table.
 Useful as a monthly refresh since the IRS updates the BMF monthly.
 
 Usage:
-    python -m scripts.run_bmf_only [--force] [--skip-bigquery]
+    python -m scripts.run_bmf_only [--force] [--skip-bigquery] [--jsonl]
 """
 
 from __future__ import annotations
@@ -23,6 +23,8 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Refresh EO BMF organisations only")
     parser.add_argument("--force", action="store_true", help="Re-download everything")
     parser.add_argument("--skip-bigquery", action="store_true", help="Skip BigQuery upload")
+    parser.add_argument("--jsonl", action="store_true",
+                        help="Also write organizations.jsonl next to the Parquet file")
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -35,7 +37,7 @@ def main() -> None:
 
     logger.info("═══ Downloading + filtering EO BMF ═══")
     from pipeline.download_bmf import download_and_parse_all
-    download_and_parse_all(force_download=args.force)
+    download_and_parse_all(force_download=args.force, write_jsonl=args.jsonl)
 
     if not args.skip_bigquery:
         logger.info("═══ Loading organisations into BigQuery ═══")
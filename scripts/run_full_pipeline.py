@@ -7,7 +7,11 @@ Steps:
   3. Download 990 XML files in parallel
   4. Parse XMLs → filings.jsonl + schedule_m.jsonl
   5. Upload JSONL to GCS and load into BigQuery
-  6. Create/refresh the prospecting view
+  6. Rebuild the prospecting table and view
+
+Steps run as a small dependency graph rather than strictly in order: the BMF
+and index downloads overlap, and the organisations load starts as soon as
+the BMF is ready instead of waiting for the XML download and parse.
 
 Usage:
     python -m scripts.run_full_pipeline [--force] [--xml-limit N]
@@ -19,9 +23,41 @@ import argparse
 import logging
 import sys
 import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
 
 logger = logging.getLogger("pipeline")
 
+# (log label, callable, names of steps it depends on)
+Step = tuple[str, Callable[[], object], set[str]]
+
+
+def run_steps(steps: dict[str, Step], max_workers: int = 4) -> None:
+    """Run *steps* on a thread pool, each once all its dependencies finish.
+
+    The stages are network- or subprocess-bound, so threads are enough to
+    overlap them.  The first failing step's exception is re-raised once the
+    steps already running have finished; nothing new is started after it.
+    """
+    pending = dict(steps)
+    done: set[str] = set()
+    running: dict[Future, str] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name, (label, fn, deps) in list(pending.items()):
+                if deps <= done:
+                    del pending[name]
+                    logger.info("═══ %s ═══", label)
+                    running[pool.submit(fn)] = name
+            if not running:
+                raise RuntimeError(f"Unsatisfiable step dependencies: {sorted(pending)}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                future.result()
+                done.add(name)
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run the full IRS 501(c)(3) pipeline")
@@ -45,39 +81,70 @@ def main() -> None:
         datefmt="%H:%M:%S",
     )
 
-    t0 = time.time()
-
-    # ── Step 1: EO BMF ────────────────────────────────────────────────
-    logger.info("═══ Step 1/6: Download + filter EO BMF (organisations) ═══")
     from pipeline.download_bmf import download_and_parse_all
-    download_and_parse_all(force_download=args.force)
-
-    # ── Step 2: 990 Index ─────────────────────────────────────────────
-    logger.info("═══ Step 2/6: Download + filter 990 e-file index ═══")
-    from pipeline.download_index import build_filtered_index
-    build_filtered_index(force=args.force)
-
-    # ── Step 3: Download XMLs ─────────────────────────────────────────
-    logger.info("═══ Step 3/6: Download 990 XML files ═══")
+    from pipeline.download_index import build_filtered_index, download_indexes
     from pipeline.download_xml import run as download_xmls
-    download_xmls(force=args.force, limit=args.xml_limit)
-
-    # ── Step 4: Parse XMLs ────────────────────────────────────────────
-    logger.info("═══ Step 4/6: Parse XML files ═══")
     from pipeline.parse_990 import parse_all_xmls
-    parse_all_xmls(force=args.force)
 
-    if not args.skip_bigquery:
-        # ── Step 5: Load into BigQuery ────────────────────────────────
-        logger.info("═══ Step 5/6: Upload to GCS + load into BigQuery ═══")
-        from pipeline.load_bigquery import load_all
-        load_all()
+    index_paths: list[Path] = []
+    steps: dict[str, Step] = {
+        "bmf": (
+            "Step 1/6: Download + filter EO BMF (organisations)",
+            lambda: download_and_parse_all(force_download=args.force),
+            set(),
+        ),
+        "index_download": (
+            "Step 2/6: Download 990 e-file index",
+            lambda: index_paths.extend(download_indexes(force=args.force)),
+            set(),
+        ),
+        "index_filter": (
+            "Step 2/6: Filter 990 e-file index",
+            lambda: build_filtered_index(force=args.force, index_paths=index_paths),
+            {"bmf", "index_download"},
+        ),
+        "xml": (
+            "Step 3/6: Download 990 XML files",
+            lambda: download_xmls(force=args.force, limit=args.xml_limit),
+            {"index_filter"},
+        ),
+        "parse": (
+            "Step 4/6: Parse XML files",
+            lambda: parse_all_xmls(force=args.force),
+            {"xml"},
+        ),
+    }
 
-        # ── Step 6: Create prospecting view ───────────────────────────
-        logger.info("═══ Step 6/6: Create prospecting view ═══")
+    if not args.skip_bigquery:
+        from pipeline.load_bigquery import load_filings, load_organizations, load_schedule_m
         from pipeline.views import create_prospecting_view
-        create_prospecting_view()
-    else:
+
+        steps.update({
+            "load_organizations": (
+                "Step 5/6: Load organisations into BigQuery",
+                load_organizations,
+                {"bmf"},
+            ),
+            "load_filings": (
+                "Step 5/6: Load filings into BigQuery",
+                load_filings,
+                {"parse"},
+            ),
+            "load_schedule_m": (
+                "Step 5/6: Load schedule_m into BigQuery",
+                load_schedule_m,
+                {"parse"},
+            ),
+            "view": (
+                "Step 6/6: Rebuild prospecting table + view",
+                create_prospecting_view,
+                {"load_organizations", "load_filings", "load_schedule_m"},
+            ),
+        })
+
+    t0 = time.time()
+    run_steps(steps)
+    if args.skip_bigquery:
         logger.info("═══ Steps 5-6 skipped (--skip-bigquery) ═══")
 
     elapsed = time.time() - t0
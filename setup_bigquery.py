@@ -8,15 +8,20 @@ Usage:
     python setup_bigquery.py
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
 from google.cloud import bigquery
 
 from pipeline.config import (
     BQ_DATASET,
     BQ_TABLE_FILINGS,
+    BQ_TABLE_NTEE_MAJOR_GROUP,
     BQ_TABLE_ORGANIZATIONS,
     BQ_TABLE_SCHEDULE_M,
+    BQ_TAX_YEAR_PARTITION_RANGE,
     GCP_LOCATION,
     GCP_PROJECT_ID,
+    NTEE_MAJOR_GROUPS,
     SCHEDULE_M_PROPERTY_TYPES,
 )
 
@@ -130,18 +135,27 @@ def filings_schema() -> list[bigquery.SchemaField]:
                              description="Total noncash contributions (Part VIII Line 1g)"),
         bigquery.SchemaField("has_schedule_m", "BOOLEAN",
                              description="Filed Schedule M (Part IV Line 29/30)"),
+        # Schedule M is 1:1 with its filing, so its columns are denormalised
+        # here too (NULL when the filing has no Schedule M).
+        *schedule_m_fields(),
     ]
 
 
 def schedule_m_schema() -> list[bigquery.SchemaField]:
-    fields: list[bigquery.SchemaField] = [
+    return [
         bigquery.SchemaField("object_id", "STRING", mode="REQUIRED",
                              description="Unique filing identifier"),
         bigquery.SchemaField("ein", "STRING", mode="REQUIRED",
                              description="Employer Identification Number"),
         bigquery.SchemaField("tax_year", "INTEGER", description="Tax year"),
+        *schedule_m_fields(),
     ]
 
+
+def schedule_m_fields() -> list[bigquery.SchemaField]:
+    """Schedule M property-type and summary columns (lines 1-32)."""
+    fields: list[bigquery.SchemaField] = []
+
     for _line, prefix, desc in SCHEDULE_M_PROPERTY_TYPES:
         fields.append(bigquery.SchemaField(
             f"{prefix}_x", "BOOLEAN", description=f"{desc} - received"))
@@ -170,6 +184,15 @@ def schedule_m_schema() -> list[bigquery.SchemaField]:
     return fields
 
 
+def ntee_major_group_schema() -> list[bigquery.SchemaField]:
+    return [
+        bigquery.SchemaField("code", "STRING", mode="REQUIRED",
+                             description="First letter of the NTEE code"),
+        bigquery.SchemaField("label", "STRING", mode="REQUIRED",
+                             description="NTEE major group name"),
+    ]
+
+
 # ── Create / update ───────────────────────────────────────────────────────
 
 
@@ -189,44 +212,105 @@ def create_table(
     schema: list[bigquery.SchemaField],
     description: str = "",
     clustering_fields: list[str] | None = None,
+    range_partitioning_field: str | None = None,
+    primary_key: list[str] | None = None,
 ) -> bigquery.Table:
     table_ref = f"{GCP_PROJECT_ID}.{BQ_DATASET}.{table_name}"
     table = bigquery.Table(table_ref, schema=schema)
     table.description = description
     if clustering_fields:
         table.clustering_fields = clustering_fields
+    if range_partitioning_field:
+        start, end, interval = BQ_TAX_YEAR_PARTITION_RANGE
+        table.range_partitioning = bigquery.RangePartitioning(
+            field=range_partitioning_field,
+            range_=bigquery.PartitionRange(start=start, end=end, interval=interval),
+        )
+    constraints = None
+    if primary_key:
+        # Informational (NOT ENFORCED) key: lets the query optimizer treat
+        # joins on it as at-most-one-match and drop unused outer joins.
+        constraints = bigquery.table.TableConstraints(
+            primary_key=bigquery.table.PrimaryKey(columns=primary_key),
+            foreign_keys=None,
+        )
+        table.table_constraints = constraints
     table = client.create_table(table, exists_ok=True)
+    existing = {field.name for field in table.schema}
+    missing = [field for field in schema if field.name not in existing]
+    if missing:
+        # Existing table from an older schema: new columns are additive, so
+        # append them in place (existing rows read them as NULL).
+        table.schema = [*table.schema, *missing]
+        table = client.update_table(table, ["schema"])
+        print(f"Table {table.table_id} gained {len(missing)} columns.")
+    if clustering_fields and table.clustering_fields != clustering_fields:
+        # Existing table with an older clustering spec: update it in place.
+        # Rows are re-clustered under the new spec on the next full reload.
+        table.clustering_fields = clustering_fields
+        table = client.update_table(table, ["clustering_fields"])
+        print(f"Table {table.table_id} re-clustered on {', '.join(clustering_fields)}.")
+    if constraints and not (table.table_constraints and table.table_constraints.primary_key):
+        table.table_constraints = constraints
+        table = client.update_table(table, ["table_constraints"])
+        print(f"Table {table.table_id} primary key set on {', '.join(primary_key)}.")
     print(f"Table {table.table_id} ready ({len(schema)} columns).")
     return table
 
 
+def create_ntee_dim(client: bigquery.Client) -> None:
+    """(Re)load the NTEE major-group lookup used by the prospecting view."""
+    table_ref = f"{GCP_PROJECT_ID}.{BQ_DATASET}.{BQ_TABLE_NTEE_MAJOR_GROUP}"
+    rows = [{"code": code, "label": label} for code, label in NTEE_MAJOR_GROUPS.items()]
+    job_config = bigquery.LoadJobConfig(
+        schema=ntee_major_group_schema(),
+        write_disposition="WRITE_TRUNCATE",
+    )
+    client.load_table_from_json(rows, table_ref, job_config=job_config).result()
+    print(f"Table {BQ_TABLE_NTEE_MAJOR_GROUP} ready ({len(rows)} rows).")
+
+
 def main() -> None:
     client = get_client()
     create_dataset(client)
 
-    create_table(
-        client,
-        BQ_TABLE_ORGANIZATIONS,
-        organizations_schema(),
-        description="IRS EO BMF – 501(c)(3) organizations",
-        clustering_fields=["state", "ntee_code"],
-    )
-
-    create_table(
-        client,
-        BQ_TABLE_FILINGS,
-        filings_schema(),
-        description="990 e-file header + Part I financial summary",
-        clustering_fields=["ein", "tax_year"],
-    )
-
-    create_table(
-        client,
-        BQ_TABLE_SCHEDULE_M,
-        schedule_m_schema(),
-        description="Schedule M – Noncash contributions by property type",
-        clustering_fields=["ein", "tax_year"],
-    )
+    # The tables are independent, so issue the create calls concurrently
+    # (the client is thread-safe) instead of one API round-trip after another.
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [
+            pool.submit(
+                create_table,
+                client,
+                BQ_TABLE_ORGANIZATIONS,
+                organizations_schema(),
+                description="IRS EO BMF – 501(c)(3) organizations",
+                # NTEE filters are more selective than state, so lead with them.
+                clustering_fields=["ntee_code", "state"],
+            ),
+            pool.submit(
+                create_table,
+                client,
+                BQ_TABLE_FILINGS,
+                filings_schema(),
+                description="990 e-file header + Part I financial summary",
+                clustering_fields=["ein", "tax_year"],
+                range_partitioning_field="tax_year",
+                primary_key=["object_id"],
+            ),
+            pool.submit(
+                create_table,
+                client,
+                BQ_TABLE_SCHEDULE_M,
+                schedule_m_schema(),
+                description="Schedule M – Noncash contributions by property type",
+                clustering_fields=["ein", "tax_year"],
+                range_partitioning_field="tax_year",
+                primary_key=["object_id"],
+            ),
+            pool.submit(create_ntee_dim, client),
+        ]
+        for future in futures:
+            future.result()
 
     print("\nAll tables created. Run the pipeline to load data.")
 
@@ -0,0 +1,44 @@
+"""Unit tests for parsing the IRS EO BMF CSV files.
+
+Uses small synthetic CSVs; nothing is downloaded.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from pipeline.config import BMF_COLUMN_MAP
+from pipeline.download_bmf import parse_bmf_csv
+
+
+def _write_bmf_csv(path: Path, rows: list[dict[str, str]]) -> Path:
+    """Write *rows* as a BMF CSV with every expected column."""
+    header = list(BMF_COLUMN_MAP)
+    lines = [",".join(header)]
+    lines.extend(",".join(row.get(col, "") for col in header) for row in rows)
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+class TestParseBmfCsv:
+    def test_filters_and_pads(self, tmp_path: Path) -> None:
+        path = _write_bmf_csv(tmp_path / "eo_xx.csv", [
+            {"EIN": "12345", "NAME": " ACME ", "SUBSECTION": "03"},
+            {"EIN": "987654321", "NAME": "OTHER", "SUBSECTION": "04"},
+        ])
+        rows = parse_bmf_csv(path).to_pylist()
+        assert len(rows) == 1
+        assert rows[0]["ein"] == "000012345"
+        assert rows[0]["name"] == "ACME"
+        assert rows[0]["subsection"] == 3
+
+    def test_bad_integers_become_null(self, tmp_path: Path) -> None:
+        """A "+" sign is accepted; overflow and junk null only their own cell."""
+        path = _write_bmf_csv(tmp_path / "eo_xx.csv", [
+            {"EIN": "1", "SUBSECTION": "03", "ASSET_AMT": "+5", "INCOME_AMT": "-7"},
+            {"EIN": "2", "SUBSECTION": "03", "ASSET_AMT": "99999999999999999999"},
+            {"EIN": "3", "SUBSECTION": "03", "ASSET_AMT": "N/A", "INCOME_AMT": "0042"},
+        ])
+        rows = parse_bmf_csv(path).to_pylist()
+        assert [r["asset_amount"] for r in rows] == [5, None, None]
+        assert [r["income_amount"] for r in rows] == [-7, None, 42]
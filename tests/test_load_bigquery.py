@@ -0,0 +1,74 @@
+"""Unit tests for the JSONL → Parquet conversion used before BigQuery loads.
+
+Only local files are touched; nothing is sent to GCS or BigQuery.
+"""
+
+from __future__ import annotations
+
+import datetime
+from pathlib import Path
+
+import pyarrow.parquet as pq
+import pytest
+from google.cloud import bigquery
+
+from pipeline.load_bigquery import _check_table_columns, jsonl_to_parquet
+
+SCHEMA = [
+    bigquery.SchemaField("object_id", "STRING"),
+    bigquery.SchemaField("tax_year", "INTEGER"),
+    bigquery.SchemaField("tax_period_end", "DATE"),
+]
+
+
+class TestJsonlToParquet:
+    def test_types_from_schema(self, tmp_path: Path) -> None:
+        src = tmp_path / "filings.jsonl"
+        src.write_text(
+            '{"object_id": "A", "tax_year": 2022, "tax_period_end": "2022-12-31", "extra": 1}\n',
+            encoding="utf-8",
+        )
+        table = pq.read_table(jsonl_to_parquet(src, SCHEMA))
+        assert table.column_names == ["object_id", "tax_year", "tax_period_end"]
+        assert table.to_pylist() == [
+            {"object_id": "A", "tax_year": 2022, "tax_period_end": datetime.date(2022, 12, 31)},
+        ]
+
+    def test_malformed_date_is_null(self, tmp_path: Path) -> None:
+        src = tmp_path / "filings.jsonl"
+        src.write_text(
+            '{"object_id": "A", "tax_year": 2022, "tax_period_end": "12/31/2022"}\n'
+            '{"object_id": "B", "tax_year": 2022, "tax_period_end": "2022-06-30"}\n',
+            encoding="utf-8",
+        )
+        table = pq.read_table(jsonl_to_parquet(src, SCHEMA))
+        assert table.column("tax_period_end").to_pylist() == [None, datetime.date(2022, 6, 30)]
+
+    def test_rows_missing_required_dropped(self, tmp_path: Path) -> None:
+        schema = [
+            bigquery.SchemaField("object_id", "STRING", mode="REQUIRED"),
+            bigquery.SchemaField("ein", "STRING", mode="REQUIRED"),
+            bigquery.SchemaField("tax_year", "INTEGER"),
+        ]
+        src = tmp_path / "filings.jsonl"
+        src.write_text(
+            '{"object_id": "A", "ein": "123456789", "tax_year": null}\n'
+            '{"object_id": "B", "ein": null, "tax_year": 2022}\n'
+            '{"object_id": "C", "tax_year": 2022}\n',
+            encoding="utf-8",
+        )
+        table = pq.read_table(jsonl_to_parquet(src, schema))
+        assert table.column("object_id").to_pylist() == ["A"]
+
+
+class TestCheckTableColumns:
+    def test_matching_columns(self, tmp_path: Path) -> None:
+        src = tmp_path / "filings.jsonl"
+        src.write_text('{"object_id": "A", "tax_year": 2022}\n', encoding="utf-8")
+        _check_table_columns(src, SCHEMA, "filings")
+
+    def test_table_missing_columns(self, tmp_path: Path) -> None:
+        src = tmp_path / "filings.jsonl"
+        src.write_text('{"object_id": "A", "food_inventory_x": true}\n', encoding="utf-8")
+        with pytest.raises(RuntimeError, match="setup_bigquery.py"):
+            _check_table_columns(src, SCHEMA, "filings")
@@ -6,15 +6,25 @@ summary, contact info, and Schedule M fields.
 
 from __future__ import annotations
 
+import io
 import tempfile
+import zipfile
 from pathlib import Path
 
+import pytest
+
 from pipeline.parse_990 import (
+    _MMAP_MIN_SIZE,
+    _normalize_ein,
+    _parse_one,
     _safe_bool,
     _safe_date,
     _safe_int,
+    parse_both,
     parse_filing,
+    parse_filings,
     parse_schedule_m,
+    parse_zip,
 )
 
 # ── Helper: write a minimal 990 XML for testing ──────────────────────────
@@ -78,6 +88,9 @@ SAMPLE_990_XML = """\
 """
 
 
+SAMPLE_990_BYTES = SAMPLE_990_XML.encode("utf-8")
+
+
 def _write_sample_xml() -> Path:
     """Write the sample XML to a temp file and return its path."""
     tmp = tempfile.NamedTemporaryFile(suffix=".xml", delete=False, mode="w")
@@ -127,75 +140,191 @@ class TestSafeConversions:
         assert _safe_date(None) is None
         assert _safe_date("") is None
 
+    def test_normalize_ein(self) -> None:
+        assert _normalize_ein("123456789") == "123456789"
+        assert _normalize_ein(" 23456789 ") == "023456789"
+        assert _normalize_ein("12-3456789") == "123456789"
+        assert _normalize_ein("N/A") is None
+        assert _normalize_ein(None) is None
+
+
+# ── Fixtures: the sample parsed once per module ──────────────────────────
+
+
+@pytest.fixture(scope="module")
+def filing() -> dict:
+    result = parse_filing(io.BytesIO(SAMPLE_990_BYTES), "TEST_OBJ_001")
+    assert result is not None
+    return result
+
+
+@pytest.fixture(scope="module")
+def sched_m() -> dict:
+    result = parse_schedule_m(io.BytesIO(SAMPLE_990_BYTES), "TEST_OBJ_001", "123456789", 2022)
+    assert result is not None
+    return result
+
 
 # ── Tests: filing parser ──────────────────────────────────────────────────
 
 
 class TestParseFiling:
-    def setup_method(self) -> None:
-        self.xml_path = _write_sample_xml()
-
-    def test_basic_fields(self) -> None:
-        filing = parse_filing(self.xml_path, "TEST_OBJ_001")
-        assert filing is not None
+    def test_basic_fields(self, filing: dict) -> None:
         assert filing["object_id"] == "TEST_OBJ_001"
         assert filing["form_type"] == "990"
 
-    def test_ein_extracted(self) -> None:
-        filing = parse_filing(self.xml_path, "TEST_OBJ_001")
-        assert filing is not None
+    def test_ein_extracted(self, filing: dict) -> None:
         # EIN should be extracted, possibly padded
         ein = filing.get("ein")
         assert ein is not None
         assert "123456789" in ein
 
-    def test_has_schedule_m(self) -> None:
-        filing = parse_filing(self.xml_path, "TEST_OBJ_001")
-        assert filing is not None
+    def test_header_fields(self, filing: dict) -> None:
+        """Concordance xpaths must match the namespaced ReturnHeader."""
+        assert filing["org_name"] == "ACME FOOD BANK INC"
+        assert filing["org_state"] == "IL"
+        assert filing["tax_year"] == 2022
+        assert filing["tax_period_end"] == "2022-12-31"
+
+    def test_has_schedule_m(self, filing: dict) -> None:
         assert filing["has_schedule_m"] is True
 
+    def test_namespaced_tree(self, filing: dict) -> None:
+        """A nested namespace declaration leaves a namespaced subtree; same result."""
+        xml = SAMPLE_990_XML.replace("<IRS990>", '<IRS990 xmlns="http://www.irs.gov/efile">')
+        assert parse_filing(io.BytesIO(xml.encode("utf-8")), "TEST_OBJ_001") == filing
+
+    def test_non_numeric_ein_skipped(self) -> None:
+        """A filing without a numeric EIN has ein None and is not written."""
+        xml = SAMPLE_990_XML.replace("<EIN>123456789</EIN>", "<EIN>N/A</EIN>")
+        filing, _sched_m = parse_both(io.BytesIO(xml.encode("utf-8")), "OBJ")
+        assert filing is not None
+        assert filing["ein"] is None
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "OBJ.xml"
+            path.write_text(xml, encoding="utf-8")
+            assert _parse_one((path, "OBJ")) == (None, None)
+            path.write_text(SAMPLE_990_XML, encoding="utf-8")
+            assert _parse_one((path, "OBJ"))[0] is not None
+
+    def test_memory_mapped_file(self, filing: dict) -> None:
+        """Files above the mmap threshold parse the same as small ones."""
+        padding = "<!-- " + "x" * _MMAP_MIN_SIZE + " -->\n"
+        xml = SAMPLE_990_XML.replace("</Return>", padding + "</Return>")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "big.xml"
+            path.write_text(xml, encoding="utf-8")
+            assert path.stat().st_size > _MMAP_MIN_SIZE
+            assert parse_filing(path, "TEST_OBJ_001") == filing
+
+    def test_parse_filings_driver(self) -> None:
+        missing = Path(tempfile.gettempdir()) / "does_not_exist_990.xml"
+        jobs = [(_write_sample_xml(), "OBJ_A"), (_write_sample_xml(), "OBJ_B"), (missing, "OBJ_C")]
+        filings = list(parse_filings(jobs, workers=2))
+        assert sorted(f["object_id"] for f in filings) == ["OBJ_A", "OBJ_B"]
+        assert all(f["tax_year"] == 2022 for f in filings)
+
 
 # ── Tests: Schedule M parser ─────────────────────────────────────────────
 
 
 class TestParseScheduleM:
-    def setup_method(self) -> None:
-        self.xml_path = _write_sample_xml()
+    def test_schedule_m_parsed(self, sched_m: dict) -> None:
+        assert sched_m["object_id"] == "TEST_OBJ_001"
+        assert sched_m["ein"] == "123456789"
+        assert sched_m["tax_year"] == 2022
+
+    def test_food_inventory(self, sched_m: dict) -> None:
+        assert sched_m["food_inventory_x"] is True
+        assert sched_m["food_inventory_count"] == 350
+        assert sched_m["food_inventory_amount"] == 750000
+        assert sched_m["food_inventory_method"] == "Cost"
+
+    def test_clothing_household(self, sched_m: dict) -> None:
+        assert sched_m["clothing_household_x"] is True
+        assert sched_m["clothing_household_count"] == 120
+        assert sched_m["clothing_household_amount"] == 50000
+
+    def test_empty_property_types(self, sched_m: dict) -> None:
+        # Art should not have been reported
+        assert sched_m["art_works_x"] is None
+        assert sched_m["art_works_count"] is None
 
-    def test_schedule_m_parsed(self) -> None:
-        result = parse_schedule_m(self.xml_path, "TEST_OBJ_001", "123456789", 2022)
-        assert result is not None
-        assert result["object_id"] == "TEST_OBJ_001"
-        assert result["ein"] == "123456789"
-        assert result["tax_year"] == 2022
+    def test_summary_questions(self, sched_m: dict) -> None:
+        assert sched_m["gift_acceptance_policy"] is True
+        assert sched_m["uses_third_parties"] is False
 
-    def test_food_inventory(self) -> None:
-        result = parse_schedule_m(self.xml_path, "TEST_OBJ_001", "123456789", 2022)
+    def test_reads_path(self) -> None:
+        result = parse_schedule_m(_write_sample_xml(), "TEST_OBJ_001", "123456789", 2022)
         assert result is not None
-        assert result["food_inventory_x"] is True
-        assert result["food_inventory_count"] == 350
         assert result["food_inventory_amount"] == 750000
-        assert result["food_inventory_method"] == "Cost"
-
-    def test_clothing_household(self) -> None:
-        result = parse_schedule_m(self.xml_path, "TEST_OBJ_001", "123456789", 2022)
-        assert result is not None
-        assert result["clothing_household_x"] is True
-        assert result["clothing_household_count"] == 120
-        assert result["clothing_household_amount"] == 50000
 
-    def test_empty_property_types(self) -> None:
-        result = parse_schedule_m(self.xml_path, "TEST_OBJ_001", "123456789", 2022)
+    def test_parse_both(self) -> None:
+        filing, sched_m = parse_both(io.BytesIO(SAMPLE_990_BYTES), "TEST_OBJ_001")
+        assert filing is not None and sched_m is not None
+        assert sched_m["ein"] == filing["ein"]
+        assert sched_m["tax_year"] == 2022
+        # Schedule M columns are denormalised onto the filing row
+        assert filing["food_inventory_amount"] == sched_m["food_inventory_amount"]
+
+    def test_part_iv_no_still_parsed(self) -> None:
+        """Part IV answering "no" does not hide a Schedule M that is present."""
+        xml = SAMPLE_990_XML.replace(
+            "<NoncashContributionsInd>true<", "<NoncashContributionsInd>false<",
+        )
+        result = parse_schedule_m(io.BytesIO(xml.encode("utf-8")), "OBJ", "1", 2022)
         assert result is not None
-        # Art should not have been reported
-        assert result["art_works_x"] is None
-        assert result["art_works_count"] is None
+        assert result["food_inventory_x"] is True
 
-    def test_summary_questions(self) -> None:
-        result = parse_schedule_m(self.xml_path, "TEST_OBJ_001", "123456789", 2022)
+    def test_stream_stops_after_return_data(self) -> None:
+        """Nothing after ReturnData is read once it closes."""
+        xml = """\
+<?xml version="1.0" encoding="utf-8"?>
+<Return>
+  <ReturnData>
+    <ScheduleM>
+      <Form8283ReceivedCnt>2</Form8283ReceivedCnt>
+    </ScheduleM>
+  </ReturnData>
+  <Broken"""
+        result = parse_schedule_m(io.BytesIO(xml.encode("utf-8")), "OBJ", "1", 2022)
         assert result is not None
-        assert result["gift_acceptance_policy"] is True
-        assert result["uses_third_parties"] is False
+        assert result["num_forms_8283"] == 2
+
+    def test_parse_both_ignores_part_iv(self) -> None:
+        """A Schedule M in the return is parsed even when Part IV says no."""
+        xml = SAMPLE_990_XML.replace(
+            "<NoncashContributionsInd>true<", "<NoncashContributionsInd>false<",
+        )
+        filing, sched_m = parse_both(io.BytesIO(xml.encode("utf-8")), "OBJ")
+        assert filing["has_schedule_m"] is False
+        assert sched_m is not None
+        assert sched_m["food_inventory_x"] is True
+
+    def test_any_part_iv_indicator(self) -> None:
+        """Either the line 29 or the line 30 indicator marks Schedule M as required."""
+        xml = SAMPLE_990_XML.replace(
+            "<NoncashContributionsInd>",
+            "<DeductibleNonCashContriInd>false</DeductibleNonCashContriInd>\n"
+            "      <NoncashContributionsInd>",
+        )
+        filing, sched_m = parse_both(io.BytesIO(xml.encode("utf-8")), "OBJ")
+        assert filing["has_schedule_m"] is True
+        assert sched_m is not None
+
+    def test_parse_zip(self) -> None:
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("2023_TEOS_XML_01A/202301234567890123_public.xml", SAMPLE_990_XML)
+            zf.writestr("2023_TEOS_XML_01A/broken.xml", "<Return>")
+            zf.writestr("2023_TEOS_XML_01A/README.txt", "not a return")
+        buf.seek(0)
+        results = list(parse_zip(buf))
+        assert len(results) == 1
+        filing, sched_m = results[0]
+        assert filing["object_id"] == "202301234567890123"
+        assert sched_m is not None
+        assert sched_m["food_inventory_amount"] == 750000
 
     def test_no_schedule_m_returns_none(self) -> None:
         """An XML without Schedule M should return None."""
@@ -208,8 +337,5 @@ class TestParseScheduleM:
     </IRS990>
   </ReturnData>
 </Return>"""
-        tmp = tempfile.NamedTemporaryFile(suffix=".xml", delete=False, mode="w")
-        tmp.write(minimal)
-        tmp.close()
-        result = parse_schedule_m(Path(tmp.name), "OBJ_002", "999999999", 2023)
+        result = parse_schedule_m(io.BytesIO(minimal.encode("utf-8")), "OBJ_002", "999999999", 2023)
         assert result is None
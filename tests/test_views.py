@@ -0,0 +1,91 @@
+"""Unit tests for the prospecting table / view SQL builders.
+
+These check the generated SQL text only; nothing is sent to BigQuery.
+"""
+
+from __future__ import annotations
+
+from pipeline.config import (
+    BQ_TABLE_ORGANIZATIONS,
+    BQ_TABLE_PROSPECTING,
+    BQ_TABLE_SCHEDULE_M,
+    BQ_VIEW_PROSPECTING,
+    SCHEDULE_M_ACCEPTS_ALIASES,
+    SCHEDULE_M_PROPERTY_TYPES,
+)
+from pipeline.views import _LATEST_FILING_YEARS, build_table_sql, build_view_sql
+
+# ── Tests: latest-filing selection ───────────────────────────────────────
+
+
+class TestLatestFiling:
+    def setup_method(self) -> None:
+        self.sql = build_table_sql()
+
+    def test_uses_qualify(self) -> None:
+        assert "QUALIFY ROW_NUMBER() OVER (" in self.sql
+        assert ") = 1" in self.sql
+
+    def test_no_rank_column_subquery(self) -> None:
+        assert "_rn" not in self.sql
+
+    def test_recent_years_only(self) -> None:
+        assert self.sql.startswith("DECLARE max_year INT64")
+        assert "SET cutoff = max_year - " in self.sql
+        assert "INFORMATION_SCHEMA.PARTITIONS" in self.sql
+        assert "WHERE f.tax_year >= cutoff" in self.sql
+
+    def test_window_is_bounded(self) -> None:
+        """Filings older than the window (or without a tax_year) are not candidates."""
+        assert _LATEST_FILING_YEARS == 4
+        assert f"SET cutoff = max_year - {_LATEST_FILING_YEARS};" in self.sql
+        assert "f.tax_year IS NULL" not in self.sql
+
+    def test_orgs_without_recent_filing_kept(self) -> None:
+        """Organisations stay in the output with NULL filing columns."""
+        assert (
+            f".{BQ_TABLE_ORGANIZATIONS} AS o\n"
+            "LEFT JOIN latest_filing AS lf ON o.ein = lf.ein"
+        ) in self.sql
+
+
+# ── Tests: table / view statements ───────────────────────────────────────
+
+
+class TestStatements:
+    def test_table_statement(self) -> None:
+        sql = build_table_sql()
+        assert "\nCREATE OR REPLACE TABLE " in sql
+        assert f".{BQ_TABLE_PROSPECTING}\n" in sql
+        assert "CLUSTER BY ntee_code, state" in sql
+
+    def test_view_reads_table(self) -> None:
+        sql = build_view_sql()
+        assert f".{BQ_VIEW_PROSPECTING} AS" in sql
+        assert sql.rstrip().endswith(f".{BQ_TABLE_PROSPECTING}")
+
+
+# ── Tests: Schedule M convenience columns ────────────────────────────────
+
+
+class TestScheduleMColumns:
+    def setup_method(self) -> None:
+        self.sql = build_table_sql()
+
+    def test_accepts_aliases(self) -> None:
+        for prefix, alias in SCHEDULE_M_ACCEPTS_ALIASES.items():
+            assert f"COALESCE(lf.{prefix}_x, FALSE)" in self.sql
+            assert f"AS {alias}," in self.sql
+
+    def test_accepts_bitmask(self) -> None:
+        for bit, (_line, prefix, _desc) in enumerate(SCHEDULE_M_PROPERTY_TYPES):
+            assert f"IF(lf.{prefix}_x, {1 << bit}, 0)" in self.sql
+        assert "AS accepts_bitmask," in self.sql
+
+    def test_read_from_filing_row(self) -> None:
+        assert f".{BQ_TABLE_SCHEDULE_M} " not in self.sql
+        assert "object_id = m.object_id" not in self.sql
+
+    def test_noncash_totals(self) -> None:
+        assert "(SELECT SUM(v) FROM UNNEST([IFNULL(lf.art_works_amount, 0), " in self.sql
+        assert "(SELECT COUNTIF(v) FROM UNNEST([lf.art_works_x, " in self.sql